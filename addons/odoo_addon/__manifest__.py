@@ -15,6 +15,7 @@
     ],
     'data': [
         'security/ir.model.access.csv',
+        'data/account_mapping_cron.xml',
         'views/menu_views.xml',
         'views/odoo_addon_views.xml',
         'views/res_partner_views.xml',
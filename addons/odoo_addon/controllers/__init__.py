@@ -1 +1,2 @@
-from . import test_page
\ No newline at end of file
+from . import test_page
+from . import account_mapping
\ No newline at end of file
@@ -0,0 +1,48 @@
+from odoo import http
+from odoo.http import request
+
+ACCOUNT_PAGE_SIZE = 200
+ACCOUNT_PAGE_MAX_SIZE = 1000
+
+
+class AccountMappingController(http.Controller):
+
+    def _get_account_domain(self, search=None, status=None):
+        domain = []
+        if search:
+            domain += ['|', ('code', '=ilike', search + '%'), ('name', 'ilike', search)]
+        if status == 'mapped':
+            domain.append(('x_api_mapping', '!=', False))
+        elif status == 'unmapped':
+            domain.append(('x_api_mapping', '=', False))
+        return domain
+
+    @http.route('/odoo_addon/unified_accounts', type='json', auth='user')
+    def unified_accounts(self):
+        """[[id, name], ...] of the local mirror of the unified accounts."""
+        return request.env['unified.account']._get_options()
+
+    @http.route('/odoo_addon/accounts/page', type='json', auth='user')
+    def accounts_page(self, after=0, limit=ACCOUNT_PAGE_SIZE, search=None, status=None, with_count=False):
+        """Page of accounts after the account id `after` (keyset pagination).
+
+        Rows are [id, code, name, unified account id or false]. The code of an account
+        depends on the company, so the pages are keyed and ordered on the id.
+        """
+        accounts = request.env['account.account']
+        domain = self._get_account_domain(search, status)
+        limit = min(int(limit or ACCOUNT_PAGE_SIZE), ACCOUNT_PAGE_MAX_SIZE)
+
+        records = accounts.search(domain + [('id', '>', int(after or 0))], order='id', limit=limit)
+        rows = [
+            [row['id'], row['code'] or '', row['name'] or '', row['x_api_mapping']]
+            for row in records.read(['code', 'name', 'x_api_mapping'], load=None)
+        ]
+
+        res = {
+            'rows': rows,
+            'next': rows[-1][0] if len(rows) == limit else False,
+        }
+        if with_count:
+            res['count'] = accounts.search_count(domain)
+        return res
@@ -1,4 +1,5 @@
 from . import hello_world
 from . import grouping
 from . import account_extension
-from . import unified_account
\ No newline at end of file
+from . import unified_account
+from . import account_mapping_event
\ No newline at end of file
@@ -0,0 +1,227 @@
+import logging
+import threading
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+MAPPING_API_URL = 'https://192.168.0.212:3002/odoo/accounts/map'
+# url of the bulk endpoint, the mappings are sent one by one to MAPPING_API_URL when
+# it is not set or not found. It takes {'mappings': [mapping, ...]} and answers
+# {'results': [{'status': <http status>, 'error': <message>}, ...]} in the same order
+MAPPING_BULK_API_URL_PARAM = 'odoo_addon.mapping_bulk_api_url'
+MAPPING_API_TIMEOUT = 5
+# seconds added to the timeout per mapping of a bulk request
+MAPPING_API_TIMEOUT_PER_MAPPING = 0.05
+# events sent per batch, the transaction is committed after each batch
+MAPPING_BATCH_SIZE = 100
+# batches sent per cron run, the cron triggers itself again when events remain
+MAPPING_BATCHES_PER_RUN = 20
+# seconds before the first retry, doubled on each failed attempt
+MAPPING_RETRY_DELAY = 30
+MAPPING_MAX_ATTEMPTS = 8
+# client errors worth retrying, the mappings rejected with another 4xx are failed
+MAPPING_RETRY_STATUSES = (408, 429)
+# sent events are kept this long for troubleshooting
+MAPPING_DONE_RETENTION = timedelta(days=7)
+
+_local = threading.local()
+
+
+def _get_session():
+    """Keep-alive session of the current thread, so batches reuse the connection to the API."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+    return session
+
+
+def _is_rejected(status):
+    """Whether the API refused the mapping itself, sending it again would not help."""
+    return 400 <= status < 500 and status not in MAPPING_RETRY_STATUSES
+
+
+def _get_error(response):
+    return '%s %s' % (response.status_code, response.text[:500])
+
+
+class AccountMappingEvent(models.Model):
+    """Outbox of the account mappings to send to the mapping API.
+
+    Events are created in the transaction changing the mapping and sent by a cron,
+    so the API is never called while the accounts are locked. The write path only
+    inserts, the dispatcher sends the newest event of each account and supersedes the
+    older ones, so a mapping change never waits on a batch being sent.
+    """
+    _name = 'account.mapping.event'
+    _description = 'Account Mapping Event'
+    _order = 'id'
+
+    account_id = fields.Many2one('account.account', string='Account', required=True, ondelete='cascade', index=True)
+    unified_id = fields.Char(string='Unified ID', required=True)
+    account_code = fields.Char(string='Account Code')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Attempts', default=0)
+    next_attempt = fields.Datetime(string='Next Attempt', default=fields.Datetime.now)
+    last_error = fields.Text(string='Last Error')
+
+    @api.model
+    def _enqueue(self, accounts, unified):
+        self.sudo().create([{
+            'account_id': account.id,
+            'unified_id': unified.api_id,
+            'account_code': account.code,
+        } for account in accounts])
+
+        cron = self.env.ref('odoo_addon.ir_cron_account_mapping_dispatch', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    def _get_mapping(self):
+        return {
+            'account_id': self.account_id.id,
+            'unified_id': self.unified_id,
+            'account_code': self.account_code,
+        }
+
+    def _post(self, url, payload):
+        return _get_session().post(
+            url, json=payload, timeout=MAPPING_API_TIMEOUT + MAPPING_API_TIMEOUT_PER_MAPPING * len(self))
+
+    def _send_each(self):
+        """Send the mappings of the events one by one, returns {event id: (error, rejected)} of the events not sent."""
+        errors = {}
+        for i, event in enumerate(self):
+            try:
+                response = event._post(MAPPING_API_URL, event._get_mapping())
+            except requests.RequestException as e:
+                # the API is not reachable, the remaining events are retried later
+                errors.update({o.id: (str(e), False) for o in self[i:]})
+                break
+            if not response.ok:
+                errors[event.id] = (_get_error(response), _is_rejected(response.status_code))
+        return errors
+
+    def _send(self, bulk_url):
+        """Send the mappings of the events in one request, returns {event id: (error, rejected)} of the events not sent.
+
+        A request refused as a whole is split in two until the rejected mappings are
+        found, so they do not hold back the other mappings of the batch.
+        """
+        if not bulk_url:
+            return self._send_each()
+
+        try:
+            response = self._post(bulk_url, {'mappings': [event._get_mapping() for event in self]})
+        except requests.RequestException as e:
+            return {event.id: (str(e), False) for event in self}
+
+        if response.status_code in (404, 405):
+            _logger.info('Account mapping bulk endpoint %s not available, sending the mappings one by one', bulk_url)
+            return self._send_each()
+        if _is_rejected(response.status_code):
+            if len(self) == 1:
+                return {self.id: (_get_error(response), True)}
+            half = len(self) // 2
+            return {**self[:half]._send(bulk_url), **self[half:]._send(bulk_url)}
+        if not response.ok:
+            return {event.id: (_get_error(response), False) for event in self}
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        # accepted without details, all the mappings are sent
+        results = data.get('results') or [] if isinstance(data, dict) else []
+        errors = {}
+        for event, result in zip(self, results):
+            status = result.get('status') or 200
+            if status >= 400:
+                errors[event.id] = (result.get('error') or str(status), _is_rejected(status))
+        return errors
+
+    def _dispatch_batch(self):
+        bulk_url = self.env['ir.config_parameter'].sudo().get_param(MAPPING_BULK_API_URL_PARAM)
+        errors = self._send(bulk_url)
+        if errors:
+            _logger.warning('Account mapping API call failed for %s of %s accounts', len(errors), len(self))
+
+        now = fields.Datetime.now()
+        for event in self.filtered(lambda o: o.id in errors):
+            error, rejected = errors[event.id]
+            attempts = event.attempts + 1
+            event.write({
+                'attempts': attempts,
+                'state': 'failed' if rejected or attempts >= MAPPING_MAX_ATTEMPTS else 'pending',
+                'next_attempt': now + timedelta(seconds=MAPPING_RETRY_DELAY * 2 ** (attempts - 1)),
+                'last_error': error,
+            })
+
+        self.filtered(lambda o: o.id not in errors).write({'state': 'done', 'last_error': False})
+
+    @api.model
+    def _supersede_events(self):
+        """Only the newest mapping of an account matters, supersede the pending events it replaces."""
+        self.env.cr.execute("""
+            UPDATE account_mapping_event
+            SET state = 'superseded', write_date = now() at time zone 'UTC'
+            WHERE id IN (
+                SELECT e.id FROM account_mapping_event e
+                WHERE e.state = 'pending'
+                  AND e.id < (
+                      SELECT max(n.id) FROM account_mapping_event n
+                      WHERE n.account_id = e.account_id AND n.state = 'pending'
+                  )
+                FOR UPDATE SKIP LOCKED
+            )
+        """)
+        self.invalidate_model(['state'])
+
+    @api.model
+    def _get_due_batch(self):
+        # skip the events locked by another running dispatcher, and the events replaced
+        # by a newer one created since the last collapse
+        self.env.cr.execute("""
+            SELECT e.id FROM account_mapping_event e
+            WHERE e.state = 'pending' AND e.next_attempt <= now() at time zone 'UTC'
+              AND NOT EXISTS (
+                  SELECT 1 FROM account_mapping_event n
+                  WHERE n.account_id = e.account_id AND n.state = 'pending' AND n.id > e.id
+              )
+            ORDER BY e.id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, [MAPPING_BATCH_SIZE])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _cron_dispatch(self):
+        self._supersede_events()
+        self.env.cr.commit()
+
+        for _i in range(MAPPING_BATCHES_PER_RUN):
+            batch = self._get_due_batch()
+            if not batch:
+                return
+            batch._dispatch_batch()
+            self.env.cr.commit()
+
+        # more events are due, continue in another run to release the cron worker
+        self.env.ref('odoo_addon.ir_cron_account_mapping_dispatch')._trigger()
+
+    @api.autovacuum
+    def _gc_done_events(self):
+        self.search([
+            ('state', 'in', ('done', 'superseded')),
+            ('write_date', '<', fields.Datetime.now() - MAPPING_DONE_RETENTION),
+        ]).unlink()
@@ -1,8 +1,104 @@
-from odoo import models, fields
+import logging
+
+import requests
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+UNIFIED_API_URL = 'https://192.168.0.212:3002/odoo/accounts/unified'
+UNIFIED_API_TIMEOUT = 30
+# sync state kept in ir.config_parameter
+UNIFIED_ETAG_PARAM = 'odoo_addon.unified_accounts_etag'
+UNIFIED_CURSOR_PARAM = 'odoo_addon.unified_accounts_cursor'
+
 
 class UnifiedAccount(models.Model):
+    """Mirror of the unified accounts of the external API, kept current by a cron."""
     _name = 'unified.account'
     _description = 'Unified Account'
 
     name = fields.Char(string='Name', required=True)
-    api_id = fields.Char(string='API ID', required=True)
\ No newline at end of file
+    api_id = fields.Char(string='API ID', required=True, index=True)
+    active = fields.Boolean(string='Active', default=True)
+
+    @api.model
+    def _get_options(self):
+        """[(id, name), ...] of the active unified accounts, for the mapping selectors."""
+        # any create, write or unlink of the mirror changes the version, no cache to clear
+        version = self.sudo().with_context(active_test=False)._read_group([], aggregates=['write_date:max', '__count'])[0]
+        return self._get_options_by_version(version)
+
+    @api.model
+    @tools.ormcache('version')
+    def _get_options_by_version(self, version):
+        return tuple((o.id, o.name) for o in self.sudo().search([], order='name, id'))
+
+    def _fetch_unified_accounts(self, etag=None, cursor=None):
+        """Returns (accounts, etag, cursor), accounts is None when nothing changed."""
+        headers = {'Accept': 'application/json'}
+        if etag:
+            headers['If-None-Match'] = etag
+        params = {'updated_since': cursor} if cursor else {}
+
+        response = requests.get(UNIFIED_API_URL, headers=headers, params=params, timeout=UNIFIED_API_TIMEOUT)
+        if response.status_code == 304:
+            return None, etag, cursor
+        response.raise_for_status()
+
+        data = response.json()
+        # Expecting data.accounts = [{id, name, updated_at?}, ...] or the list itself
+        accounts = data.get('accounts') if isinstance(data, dict) else data
+        if not isinstance(accounts, list):
+            raise ValueError('Unexpected unified accounts response')
+
+        updated = [o['updated_at'] for o in accounts if o.get('updated_at')]
+        if isinstance(data, dict) and data.get('cursor'):
+            cursor = data['cursor']
+        elif updated:
+            cursor = max(updated)
+        else:
+            # the api does not support deltas, every answer is the full catalogue
+            cursor = None
+        return accounts, response.headers.get('ETag'), cursor
+
+    @api.model
+    def _sync_unified_accounts(self, full=False):
+        params = self.env['ir.config_parameter'].sudo()
+        etag = None if full else params.get_param(UNIFIED_ETAG_PARAM)
+        cursor = None if full else params.get_param(UNIFIED_CURSOR_PARAM)
+
+        accounts, etag, new_cursor = self._fetch_unified_accounts(etag, cursor)
+        if accounts is None:
+            return
+
+        mirror = self.sudo().with_context(active_test=False)
+        existing = {o.api_id: o for o in mirror.search([('api_id', 'in', [str(a['id']) for a in accounts])])}
+
+        to_create = []
+        for account in accounts:
+            api_id = str(account['id'])
+            record = existing.get(api_id)
+            active = not account.get('deleted', False)
+            if record is None:
+                if active:
+                    to_create.append({'name': account['name'], 'api_id': api_id})
+            elif record.name != account['name'] or record.active != active:
+                record.write({'name': account['name'], 'active': active})
+        if to_create:
+            mirror.create(to_create)
+
+        if not cursor:
+            # full catalogue, the accounts missing from it were removed from the api
+            api_ids = [str(a['id']) for a in accounts]
+            mirror.search([('api_id', 'not in', api_ids), ('active', '=', True)]).write({'active': False})
+
+        params.set_param(UNIFIED_ETAG_PARAM, etag or '')
+        params.set_param(UNIFIED_CURSOR_PARAM, new_cursor or '')
+
+    @api.model
+    def _cron_sync_unified_accounts(self):
+        try:
+            self._sync_unified_accounts()
+        except Exception as e:
+            _logger.warning('Unified accounts sync failed: %s', e)
@@ -1,6 +1,39 @@
 odoo.define('odoo_addon.account_mapping', [], function () {
     "use strict";
 
+    // rows are rendered only around the visible part of the table, they must have a fixed height
+    var ROW_HEIGHT = 40;
+    var OVERSCAN = 10;
+    var PAGE_SIZE = 200;
+    var SEARCH_DELAY = 300;
+
+    function jsonRpc(url, params) {
+        return fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                jsonrpc: '2.0',
+                method: 'call',
+                params: params
+            })
+        })
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+            if (data.error) {
+                throw new Error((data.error.data && data.error.data.message) || data.error.message);
+            }
+            return data.result;
+        });
+    }
+
+    function escapeHtml(value) {
+        return String(value === undefined || value === null ? '' : value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;');
+    }
+
     function initializeAccountTable() {
         // Check if we're on the account table page
         var checkForContainer = function() {
@@ -17,58 +50,44 @@ odoo.define('odoo_addon.account_mapping', [], function () {
             // Show loading state
             container.innerHTML = '<div class="text-center"><div class="spinner-border" role="status"><span class="sr-only">Loading...</span></div><p>Loading accounts...</p></div>';
 
-            // Fetch accounts via RPC
-            fetch('/web/dataset/call_kw', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    jsonrpc: '2.0',
-                    method: 'call',
-                    params: {
-                        model: 'account.account',
-                        method: 'search_read',
-                        args: [[], ['id', 'name', 'code', 'x_api_mapping']],
-                        kwargs: { limit: 100 } // Limit for demo
-                    }
-                })
-            })
-            .then(function (response) { return response.json(); })
-            .then(function (data) {
-                var accounts = data.result || [];
-                // Fetch unified accounts for dropdown
-                fetch('/web/dataset/call_kw', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        jsonrpc: '2.0',
-                        method: 'call',
-                        params: {
-                            model: 'unified.account',
-                            method: 'search_read',
-                            args: [[], ['id', 'name']],
-                            kwargs: {}
-                        }
-                    })
-                })
-                .then(function (res) { return res.json(); })
-                .then(function (unifiedData) {
-                    var unifiedAccounts = unifiedData.result || [];
-                    renderAccountTable(accounts, unifiedAccounts, container);
-                })
-                .catch(function (error) {
-                    console.error('Error fetching unified accounts:', error);
-                    renderAccountTable(accounts, [], container);
-                });
-            })
+            // Fetch unified accounts once for the dropdowns, from the local mirror
+            jsonRpc('/odoo_addon/unified_accounts', {})
             .catch(function (error) {
-                console.error('Error fetching accounts:', error);
-                renderErrorMessage('Failed to load accounts. Please check the console for details.', container);
+                console.error('Error fetching unified accounts:', error);
+                return [];
+            })
+            .then(function (unifiedAccounts) {
+                renderAccountTable(unifiedAccounts, container);
             });
         };
 
-        var renderAccountTable = function(accounts, unifiedAccounts, container) {
-            var html = '<div class="overflow-x-auto">' +
-                '<table class="shadcn-table">' +
+        var renderAccountTable = function(unifiedAccounts, container) {
+            // [[id, code, name, unified account id], ...] in the order of the pages
+            var state = {
+                rows: [],
+                next: 0,
+                count: 0,
+                loading: false,
+                search: '',
+                status: 'all',
+                generation: 0
+            };
+
+            // options are the same for every row, the selection is set on the rendered rows
+            var optionsHtml = '<option value="">Select mapping</option>' + unifiedAccounts.map(function (ua) {
+                return '<option value="' + ua[0] + '">' + escapeHtml(ua[1]) + '</option>';
+            }).join('');
+
+            container.innerHTML = '<div class="account-mapping-toolbar">' +
+                '<input type="search" class="account-mapping-search o_input" placeholder="Search code or name"/>' +
+                '<select class="account-mapping-status o_input">' +
+                '<option value="all">All</option>' +
+                '<option value="mapped">Mapped</option>' +
+                '<option value="unmapped">Not mapped</option>' +
+                '</select>' +
+                '<span class="account-mapping-count"></span>' +
+                '</div>' +
+                '<table class="shadcn-table account-mapping-table">' +
                 '<thead class="shadcn-table-header">' +
                 '<tr class="shadcn-table-row border-b">' +
                 '<th class="shadcn-table-head">ID</th>' +
@@ -77,87 +96,143 @@ odoo.define('odoo_addon.account_mapping', [], function () {
                 '<th class="shadcn-table-head">Mapping</th>' +
                 '</tr>' +
                 '</thead>' +
-                '<tbody class="shadcn-table-body">';
+                '</table>' +
+                '<div class="account-mapping-viewport">' +
+                '<div class="account-mapping-spacer">' +
+                '<table class="shadcn-table account-mapping-table account-mapping-window">' +
+                '<tbody class="shadcn-table-body"></tbody>' +
+                '</table>' +
+                '</div>' +
+                '</div>';
+
+            var viewport = container.querySelector('.account-mapping-viewport');
+            var spacer = container.querySelector('.account-mapping-spacer');
+            var windowTable = container.querySelector('.account-mapping-window');
+            var tbody = windowTable.querySelector('tbody');
+            var countLabel = container.querySelector('.account-mapping-count');
+            var frame = null;
 
-            accounts.forEach(function (account) {
-                var mappingSelect = '<select class="mapping-dropdown" data-account-id="' + account.id + '" data-account-code="' + (account.code || '') + '">' +
-                    '<option value="">Select mapping</option>';
-                unifiedAccounts.forEach(function (ua) {
-                    var selected = account.x_api_mapping && account.x_api_mapping[0] == ua.id ? ' selected' : '';
-                    mappingSelect += '<option value="' + ua.id + '"' + selected + '>' + ua.name + '</option>';
+            var loadPage = function() {
+                if (state.loading || state.next === false) {
+                    return;
+                }
+                state.loading = true;
+                var generation = state.generation;
+                jsonRpc('/odoo_addon/accounts/page', {
+                    after: state.next,
+                    limit: PAGE_SIZE,
+                    search: state.search,
+                    status: state.status,
+                    with_count: state.next === 0
+                })
+                .then(function (page) {
+                    if (generation !== state.generation) {
+                        return; // search changed while loading
+                    }
+                    state.rows = state.rows.concat(page.rows);
+                    state.next = page.next;
+                    if (page.count !== undefined) {
+                        state.count = page.count;
+                    }
+                    state.loading = false;
+                    render();
+                })
+                .catch(function (error) {
+                    state.loading = false;
+                    console.error('Error fetching accounts:', error);
+                    renderErrorMessage('Failed to load accounts. Please check the console for details.', container);
                 });
-                mappingSelect += '</select>';
+            };
 
-                html += '<tr class="shadcn-table-row">' +
-                    '<td class="shadcn-table-cell">' + account.id + '</td>' +
-                    '<td class="shadcn-table-cell">' + (account.name || '') + '</td>' +
-                    '<td class="shadcn-table-cell">' + (account.code || '') + '</td>' +
-                    '<td class="shadcn-table-cell">' + mappingSelect + '</td>' +
-                    '</tr>';
-            });
+            var render = function() {
+                frame = null;
+                spacer.style.height = (Math.max(state.count, state.rows.length) * ROW_HEIGHT) + 'px';
+                countLabel.textContent = state.count + ' accounts';
+
+                var first = Math.max(Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN, 0);
+                var last = Math.floor((viewport.scrollTop + viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN;
+
+                var html = '';
+                state.rows.slice(first, last).forEach(function (row, i) {
+                    html += '<tr class="shadcn-table-row" data-index="' + (first + i) + '">' +
+                        '<td class="shadcn-table-cell">' + row[0] + '</td>' +
+                        '<td class="shadcn-table-cell">' + escapeHtml(row[2]) + '</td>' +
+                        '<td class="shadcn-table-cell">' + escapeHtml(row[1]) + '</td>' +
+                        '<td class="shadcn-table-cell"><select class="mapping-dropdown">' + optionsHtml + '</select></td>' +
+                        '</tr>';
+                });
+                tbody.innerHTML = html;
+                windowTable.style.top = (first * ROW_HEIGHT) + 'px';
 
-            html += '</tbody></table></div>';
+                tbody.querySelectorAll('.mapping-dropdown').forEach(function (dropdown) {
+                    var row = state.rows[parseInt(dropdown.closest('tr').getAttribute('data-index'))];
+                    dropdown.value = row[3] || '';
+                });
 
-            container.innerHTML = html;
+                // fetch the next page before reaching the end of the loaded rows
+                if (last >= state.rows.length) {
+                    loadPage();
+                }
+            };
 
-            // Add event listeners for mapping dropdowns
-            var dropdowns = container.querySelectorAll('.mapping-dropdown');
-            dropdowns.forEach(function(dropdown) {
-                dropdown.addEventListener('change', function() {
-                    var accountId = this.getAttribute('data-account-id');
-                    var accountCode = this.getAttribute('data-account-code');
-                    var unifiedId = this.value;
+            var scheduleRender = function() {
+                if (frame === null) {
+                    frame = requestAnimationFrame(render);
+                }
+            };
 
-                    // Update Odoo record
-                    fetch('/web/dataset/call_kw', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
-                            jsonrpc: '2.0',
-                            method: 'call',
-                            params: {
-                                model: 'account.account',
-                                method: 'write',
-                                args: [[parseInt(accountId)], {'x_api_mapping': unifiedId ? parseInt(unifiedId) : false}],
-                                kwargs: {}
-                            }
-                        })
-                    })
-                    .then(function (res) {
-                        if (res.ok) {
-                            console.log('Mapping updated in Odoo for account', accountId);
-                        } else {
-                            console.error('Failed to update mapping in Odoo');
-                        }
-                    })
-                    .catch(function (err) {
-                        console.error('Error updating mapping in Odoo', err);
-                    });
+            var reload = function() {
+                state.generation += 1;
+                state.rows = [];
+                state.next = 0;
+                state.count = 0;
+                state.loading = false;
+                viewport.scrollTop = 0;
+                loadPage();
+            };
 
-                    // Call external API
-                    if (unifiedId) {
-                        fetch('https://192.168.0.212:3002/odoo/accounts/map', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({
-                                account_id: parseInt(accountId),
-                                unified_id: unifiedId,
-                                account_code: accountCode
-                            })
-                        })
-                        .then(function (res) {
-                            if (res.ok) {
-                                console.log('Mapping saved to external API');
-                            } else {
-                                console.error('Mapping API returned error', res.status);
-                            }
-                        })
-                        .catch(function (err) {
-                            console.error('Error calling mapping API', err);
-                        });
-                    }
+            viewport.addEventListener('scroll', scheduleRender);
+
+            var searchTimeout = null;
+            container.querySelector('.account-mapping-search').addEventListener('input', function() {
+                var search = this.value.trim();
+                clearTimeout(searchTimeout);
+                searchTimeout = setTimeout(function () {
+                    state.search = search;
+                    reload();
+                }, SEARCH_DELAY);
+            });
+
+            container.querySelector('.account-mapping-status').addEventListener('change', function() {
+                state.status = this.value;
+                reload();
+            });
+
+            // rows are re-rendered on scroll, listen on the body rather than on each dropdown
+            tbody.addEventListener('change', function(ev) {
+                if (!ev.target.classList.contains('mapping-dropdown')) {
+                    return;
+                }
+                var row = state.rows[parseInt(ev.target.closest('tr').getAttribute('data-index'))];
+                var unifiedId = ev.target.value ? parseInt(ev.target.value) : false;
+
+                // the mapping is sent to the external API by the server
+                jsonRpc('/web/dataset/call_kw', {
+                    model: 'account.account',
+                    method: 'write',
+                    args: [[row[0]], {'x_api_mapping': unifiedId}],
+                    kwargs: {}
+                })
+                .then(function () {
+                    row[3] = unifiedId;
+                })
+                .catch(function (err) {
+                    console.error('Error updating mapping in Odoo', err);
+                    ev.target.value = row[3] || '';
                 });
             });
+
+            loadPage();
         };
 
         var renderErrorMessage = function(message, container) {
@@ -168,128 +243,9 @@ odoo.define('odoo_addon.account_mapping', [], function () {
         checkForContainer();
     }
 
-    function populateUnifiedAccounts() {
-        console.log('Populating unified accounts');
-        // Fetch unified accounts options
-        fetch('https://192.168.0.212:3002/odoo/accounts/unified', {
-            method: 'GET',
-            headers: { 'Content-Type': 'application/json' },
-        })
-        .then(function (res) { return res.json(); })
-        .then(function (data) {
-            console.log('Unified accounts API response:', data);
-            // Expecting data.accounts = [{id, name}, ...] or similar
-            var accounts = data && (data.accounts || data);
-            if (!Array.isArray(accounts)) {
-                console.error('Unexpected unified accounts response', data);
-                return;
-            }
-
-            // For each account, create if not exists
-            accounts.forEach(function (a) {
-                // Use RPC to search if exists
-                fetch('/web/dataset/call_kw', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        jsonrpc: '2.0',
-                        method: 'call',
-                        params: {
-                            model: 'unified.account',
-                            method: 'search_read',
-                            args: [[['api_id', '=', a.id]], ['id']],
-                            kwargs: {}
-                        }
-                    })
-                })
-                .then(function (res) { return res.json(); })
-                .then(function (searchData) {
-                    if (searchData.result && searchData.result.length > 0) {
-                        // Exists, update name if changed
-                        var existingId = searchData.result[0].id;
-                        fetch('/web/dataset/call_kw', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({
-                                jsonrpc: '2.0',
-                                method: 'call',
-                                params: {
-                                    model: 'unified.account',
-                                    method: 'write',
-                                    args: [[existingId], {'name': a.name}],
-                                    kwargs: {}
-                                }
-                            })
-                        });
-                    } else {
-                        // Create
-                        fetch('/web/dataset/call_kw', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({
-                                jsonrpc: '2.0',
-                                method: 'call',
-                                params: {
-                                    model: 'unified.account',
-                                    method: 'create',
-                                    args: [{'name': a.name, 'api_id': a.id}],
-                                    kwargs: {}
-                                }
-                            })
-                        });
-                    }
-                })
-                .catch(function (err) {
-                    console.error('Error creating/updating unified account', err);
-                });
-            });
-        })
-        .catch(function (err) {
-            console.error('Failed to load unified accounts', err);
-        });
-    }
-
     // Initialize on DOM ready
     function init() {
-        populateUnifiedAccounts();
         initializeAccountTable();
-        // Add listener for input changes in the list (many2one widget)
-        document.addEventListener('input', function(e) {
-            console.log('input event on', e.target.tagName, e.target.name, e.target.value);
-            if (e.target.tagName === 'INPUT' && e.target.classList.contains('o-autocomplete--input') && e.target.closest('table')) {
-                var input = e.target;
-                var row = input.closest('tr');
-                var recordId = row ? row.getAttribute('data-id') : null;
-                if (recordId && input.value) {
-                    console.log('Mapping changed for record', recordId, 'to', input.value);
-                    // Get the unified record id
-                    var unifiedId = input.value;
-                    // Get account code from the row
-                    var codeCell = row.querySelector('td[data-field="code"]');
-                    var accountCode = codeCell ? codeCell.textContent.trim() : '';
-                    // Call API
-                    fetch('https://192.168.0.212:3002/odoo/accounts/map', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
-                            account_id: parseInt(recordId),
-                            unified_id: unifiedId,
-                            account_code: accountCode
-                        })
-                    })
-                    .then(function (res) {
-                        if (!res.ok) {
-                            console.error('Mapping API returned error', res.status);
-                        } else {
-                            console.log('Mapping saved to external API');
-                        }
-                    })
-                    .catch(function (err) {
-                        console.error('Error calling mapping API', err);
-                    });
-                }
-            }
-        });
     }
 
     if (document.readyState === 'loading') {
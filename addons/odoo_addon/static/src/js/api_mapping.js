@@ -1,8 +1,33 @@
 odoo.define('odoo_addon.api_mapping', [], function () {
     "use strict";
 
+    // unified accounts of the local mirror, fetched once per page load for every form
+    var unifiedAccountsPromise = null;
+
+    function getUnifiedAccounts() {
+        if (!unifiedAccountsPromise) {
+            unifiedAccountsPromise = fetch('/odoo_addon/unified_accounts', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ jsonrpc: '2.0', method: 'call', params: {} })
+            })
+            .then(function (res) { return res.json(); })
+            .then(function (data) {
+                if (data.error) {
+                    throw new Error(data.error.message);
+                }
+                return data.result;
+            })
+            .catch(function (err) {
+                unifiedAccountsPromise = null; // retry on the next form
+                throw err;
+            });
+        }
+        return unifiedAccountsPromise;
+    }
+
     function replaceApiMappingField() {
-        // Form view: replace input[name="x_api_mapping"] with select populated from external API
+        // Form view: replace input[name="x_api_mapping"] with select populated from the unified accounts
         var input = document.querySelector('input[name="x_api_mapping"]');
         if (!input) {
             return;
@@ -24,40 +49,20 @@ odoo.define('odoo_addon.api_mapping', [], function () {
         select.appendChild(placeholder);
         input.parentNode.insertBefore(select, input.nextSibling);
 
-        // Helper to get account code from form field
-        function getAccountCode() {
-            var codeField = document.querySelector('input[name="code"]');
-            if (codeField) {
-                return codeField.value || '';
-            }
-            // fallback: try to read from form labels
-            var codeEl = document.querySelector('.o_field_widget[name="code"] input');
-            return codeEl ? codeEl.value : '';
-        }
-
         // Fetch unified accounts options
-        fetch('https://192.168.0.212:3002/odoo/accounts/unified', {
-            method: 'GET',
-            headers: { 'Content-Type': 'application/json' },
-        })
-        .then(function (res) { return res.json(); })
-        .then(function (data) {
-            // Expecting data.accounts = [{id, name}, ...] or similar
+        getUnifiedAccounts()
+        .then(function (accounts) {
+            // [[id, name], ...]
             select.innerHTML = '';
             var emptyOpt = document.createElement('option');
             emptyOpt.value = '';
             emptyOpt.textContent = 'Select unified account';
             select.appendChild(emptyOpt);
 
-            var accounts = data && (data.accounts || data);
-            if (!Array.isArray(accounts)) {
-                console.error('Unexpected unified accounts response', data);
-                return;
-            }
             accounts.forEach(function (a) {
                 var opt = document.createElement('option');
-                opt.value = a.id;
-                opt.textContent = a.name;
+                opt.value = a[0];
+                opt.textContent = a[1];
                 select.appendChild(opt);
             });
 
@@ -71,34 +76,9 @@ odoo.define('odoo_addon.api_mapping', [], function () {
             select.innerHTML = '<option value="">Failed to load options</option>';
         });
 
-        // On change: update hidden input and call external mapping API
+        // On change: update hidden input, the mapping is sent to the API by the server on save
         select.addEventListener('change', function () {
-            var unifiedId = this.value;
-            input.value = unifiedId;
-
-            var accountCode = getAccountCode();
-
-            // Call external API to register mapping
-            if (unifiedId) {
-                fetch('https://192.168.0.212:3002/odoo/accounts/map', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        account_code: accountCode,
-                        unified_id: unifiedId
-                    })
-                })
-                .then(function (res) {
-                    if (!res.ok) {
-                        console.error('Mapping API returned error', res.status);
-                    } else {
-                        console.log('Mapping saved to external API');
-                    }
-                })
-                .catch(function (err) {
-                    console.error('Error calling mapping API', err);
-                });
-            }
+            input.value = this.value;
         });
     }
 
@@ -107,9 +87,18 @@ odoo.define('odoo_addon.api_mapping', [], function () {
         // Try immediately
         replaceApiMappingField();
 
-        // Observe DOM mutations to catch form loads (e.g. switching records)
+        // Observe DOM mutations to catch form loads (e.g. switching records),
+        // checked once per frame as mutations come in bursts
+        var scheduled = false;
         var observer = new MutationObserver(function () {
-            replaceApiMappingField();
+            if (scheduled) {
+                return;
+            }
+            scheduled = true;
+            requestAnimationFrame(function () {
+                scheduled = false;
+                replaceApiMappingField();
+            });
         });
         observer.observe(document.body, { childList: true, subtree: true });
     }
@@ -29,6 +29,7 @@ Technical Features:
 * Lucide icons for professional UI
 * Real-time canvas rendering
 * Undo/redo support
+* Collaborative editing, changes are synced between the open boards
 * Auto-save functionality
 * Export to PNG/SVG
 
@@ -36,7 +37,7 @@ Author: Odoo Board Team
     """,
     'author': 'Odoo Board',
     'website': 'https://www.odoo.com',
-    'depends': ['base', 'web', 'mail'],
+    'depends': ['base', 'web', 'mail', 'bus'],
     'data': [
         'security/ir.model.access.csv',
         'views/odoo_board_views.xml',
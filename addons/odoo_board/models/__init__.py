@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
-from . import whiteboard
\ No newline at end of file
+from . import whiteboard
+from . import ir_websocket
\ No newline at end of file
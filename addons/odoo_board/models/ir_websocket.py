@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import re
+
+from odoo import models
+
+# name of the board channels subscribed by the whiteboard app, see _get_bus_channel
+BOARD_CHANNEL_PATTERN = re.compile(r'^whiteboard_board_(\d+)$')
+
+
+class IrWebsocket(models.AbstractModel):
+    """Subscribe the whiteboard clients to the boards they can read"""
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        """Replace the board channel names by the boards, only the readable ones
+
+        Any client can subscribe to any channel name, the operations are sent on the
+        board record so they only reach the users allowed to read the board.
+        """
+        if self.env.uid:
+            channels = self._add_whiteboard_bus_channels(channels)
+        return super()._build_bus_channel_list(channels)
+
+    def _add_whiteboard_bus_channels(self, channels):
+        board_ids = set()
+        other_channels = []
+        for channel in channels:
+            match = isinstance(channel, str) and BOARD_CHANNEL_PATTERN.match(channel)
+            if match:
+                board_ids.add(int(match.group(1)))
+            else:
+                other_channels.append(channel)
+        if not board_ids:
+            return channels
+
+        boards = self.env['whiteboard.board'].browse(board_ids).exists()
+        return other_channels + list(boards.filtered(lambda board: board.has_access('read')))
@@ -1,7 +1,18 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from odoo.tools import sql
 import json
 import base64
+import uuid
+from datetime import timedelta
+
+# operations are kept this long for the clients reconnecting, older clients reload the board
+OPERATION_RETENTION = timedelta(days=1)
+
+# canvas pixels loaded around the viewport, so small pans show elements already loaded
+VIEWPORT_MARGIN = 1000
+# canvas pixels searched at most on each axis, a zoomed out viewport is loaded by parts
+VIEWPORT_MAX_SIZE = 12000
 
 
 class WhiteboardBoard(models.Model):
@@ -28,7 +39,8 @@ class WhiteboardBoard(models.Model):
         tracking=True
     )
     
-    # Store board data as JSON
+    # Store board data as JSON (legacy, elements are now stored in whiteboard.element,
+    # boards saved before are moved there on their first load or save)
     board_data = fields.Text(
         string='Board Data',
         help='JSON data containing all board elements'
@@ -47,13 +59,22 @@ class WhiteboardBoard(models.Model):
         help='Preview image of the board'
     )
     
-    # Related elements (for relational storage option)
+    # Elements of the board, one row per element
     element_ids = fields.One2many(
         'whiteboard.element',
         'board_id',
-        string='Elements'
+        string='Elements',
+        copy=True
     )
     
+    # Incremented on each change of the elements, see apply_operations
+    version = fields.Integer(
+        string='Version',
+        default=0,
+        readonly=True,
+        copy=False
+    )
+
     # Statistics
     element_count = fields.Integer(
         string='Element Count',
@@ -61,18 +82,31 @@ class WhiteboardBoard(models.Model):
         store=True
     )
     
-    @api.depends('board_data')
+    @api.depends('element_ids')
     def _compute_element_count(self):
+        counts = dict(self.env['whiteboard.element']._read_group(
+            [('board_id', 'in', self.ids)], ['board_id'], ['__count']
+        ))
         for record in self:
-            count = 0
-            if record.board_data:
-                try:
-                    data = json.loads(record.board_data)
-                    elements = data.get('elements', [])
-                    count = len(elements)
-                except (json.JSONDecodeError, TypeError):
-                    count = 0
-            record.element_count = count
+            record.element_count = counts.get(record, 0)
+
+    def _migrate_board_data(self):
+        """Move the elements of the legacy JSON blob to whiteboard.element rows"""
+        for board in self.filtered('board_data'):
+            elements = []
+            try:
+                data = json.loads(board.board_data)
+                elements = data.get('elements', [])
+            except (json.JSONDecodeError, TypeError):
+                elements = []
+
+            if not self.env['whiteboard.element'].search_count([('board_id', '=', board.id)], limit=1):
+                self.env['whiteboard.element'].create_from_dicts(board.id, elements)
+            board.board_data = False
+
+        # rows created before the element ids were stored keep their record id
+        for element in self.env['whiteboard.element'].search([('board_id', 'in', self.ids), ('uid', '=', False)]):
+            element.uid = str(element.id)
 
     def action_open_board(self):
         """Open the whiteboard in the current window"""
@@ -88,19 +122,19 @@ class WhiteboardBoard(models.Model):
         }
 
     @api.model
-    def get_board_data(self, board_id):
-        """Get board data for the whiteboard app"""
+    def get_board_data(self, board_id, viewport=None):
+        """Get board data for the whiteboard app
+
+        With `viewport` ({width, height} of the canvas in pixels), only the elements
+        around the area shown by the saved canvas state are returned with this area
+        (`window`) and the bounds of all the elements (`bounds`). The app loads the
+        other elements with whiteboard.element.search_viewport as it is panned.
+        """
         board = self.browse(board_id)
         if not board.exists():
             return None
         
-        elements = []
-        if board.board_data:
-            try:
-                data = json.loads(board.board_data)
-                elements = data.get('elements', [])
-            except (json.JSONDecodeError, TypeError):
-                elements = []
+        board._migrate_board_data()
         
         canvas_state = None
         if board.canvas_state:
@@ -109,28 +143,65 @@ class WhiteboardBoard(models.Model):
             except (json.JSONDecodeError, TypeError):
                 canvas_state = None
         
-        return {
+        res = {
             'id': board.id,
             'name': board.name,
             'description': board.description,
-            'elements': elements,
             'canvasState': canvas_state,
+            'version': board.version,
+            'channel': board._get_bus_channel(),
         }
 
+        if viewport:
+            transform = canvas_state or {}
+            zoom = transform.get('zoom') or 1
+            res.update(self.env['whiteboard.element'].search_viewport(board.id, {
+                'x': -(transform.get('panX') or 0) / zoom,
+                'y': -(transform.get('panY') or 0) / zoom,
+                'width': viewport['width'] / zoom,
+                'height': viewport['height'] / zoom,
+            }))
+            res['bounds'] = board._get_elements_bounds()
+        else:
+            res['elements'] = board.element_ids.to_dicts()
+
+        return res
+
+    def _get_elements_bounds(self):
+        """Bounding box {x, y, width, height} of all the elements of the board"""
+        self.ensure_one()
+        if not self.element_count:
+            return None
+
+        [(min_x, min_y, max_x, max_y)] = self.env['whiteboard.element']._read_group(
+            [('board_id', '=', self.id)], [], ['min_x:min', 'min_y:min', 'max_x:max', 'max_y:max']
+        )
+        return {'x': min_x, 'y': min_y, 'width': max_x - min_x, 'height': max_y - min_y}
+
     @api.model
     def save_board_data(self, board_id, data):
-        """Save board data from the whiteboard app"""
+        """Save board data from the whiteboard app
+
+        The elements can be given as a changeset (`changes`: {added: [elements],
+        modified: [elements], deleted: [element ids]}), only the changed rows are
+        written, or as the full list (`elements`) which replaces the elements of the board.
+        """
         board = self.browse(board_id)
         if not board.exists():
             return False
         
+        board._migrate_board_data()
+
         values = {}
         
         if 'name' in data:
             values['name'] = data['name']
         
+        if 'changes' in data:
+            board._apply_element_changes(data['changes'])
+
         if 'elements' in data:
-            values['board_data'] = json.dumps({'elements': data['elements']})
+            board._replace_elements(data['elements'])
         
         if 'canvasState' in data:
             values['canvas_state'] = json.dumps(data['canvasState'])
@@ -144,10 +215,214 @@ class WhiteboardBoard(models.Model):
             values['thumbnail'] = thumbnail_data
         
         if values:
-            self.write(values)
+            board.write(values)
         
         return True
 
+    def _apply_element_changes(self, changes):
+        """Apply a changeset of elements to the board, in O(changes)
+
+        The modified elements the board does not have, e.g. saved by a request which
+        failed, are added.
+        """
+        self.ensure_one()
+        self._lock_version()
+        modified = changes.get('modified') or []
+        known = set(self.env['whiteboard.element'].search([
+            ('board_id', '=', self.id),
+            ('uid', 'in', [str(o['id']) for o in modified if o.get('id')]),
+        ]).mapped('uid'))
+        self._apply_operations(
+            [{'type': 'add', 'id': o.get('id'), 'data': o} for o in changes.get('added') or []]
+            + [{
+                'type': 'update' if o.get('id') and str(o['id']) in known else 'add',
+                'id': o.get('id'),
+                'data': o,
+            } for o in modified]
+            + [{'type': 'delete', 'id': o} for o in changes.get('deleted') or []]
+        )
+
+    def _replace_elements(self, elements):
+        """Replace all the elements of the board by the given ones"""
+        self.ensure_one()
+        existing = set(self.element_ids.mapped('uid'))
+        uids = {str(o['id']) for o in elements if o.get('id')}
+        self._apply_element_changes({
+            'added': [o for o in elements if not o.get('id') or str(o['id']) not in existing],
+            'modified': [o for o in elements if o.get('id') and str(o['id']) in existing],
+            'deleted': [uid for uid in existing if uid not in uids],
+        })
+
+    @api.model
+    def apply_operations(self, board_id, base_version, operations, client_id=None, viewport=None):
+        """Apply the operations of a client and return the ones it missed
+
+        Operations are {type: 'add'|'update'|'delete', id: element id, data: element
+        or changed keys}, made by the client on the board at `base_version`. They are
+        merged with the operations applied since by the other clients: an update only
+        changes its keys (the last one written wins), an add of an existing element
+        replaces it, an update of an element the board does not have adds it and the
+        updates of an element deleted by another client since `base_version` are dropped.
+
+        Returns {version, operations} where operations are the ones of the other
+        clients since `base_version`, or {version, snapshot} when the log does not
+        go back that far, see _get_snapshot for `viewport`.
+        """
+        board = self.browse(board_id)
+        if not board.exists():
+            return False
+
+        board._lock_version()
+        board._migrate_board_data()
+
+        missed = board._get_operations_since(base_version or 0, client_id)
+        version, _applied = board._apply_operations(operations or [], client_id, base_version or 0)
+        if missed is None:
+            return dict(board._get_snapshot(viewport), version=version)
+        return {'version': version, 'operations': missed}
+
+    @api.model
+    def get_operations(self, board_id, since_version, client_id=None, viewport=None):
+        """Operations of the other clients since `since_version`, see apply_operations"""
+        board = self.browse(board_id)
+        if not board.exists():
+            return False
+
+        missed = board._get_operations_since(since_version or 0, client_id)
+        if missed is None:
+            return dict(board._get_snapshot(viewport), version=board.version)
+        return {'version': board.version, 'operations': missed}
+
+    def _get_snapshot(self, viewport=None):
+        """Elements of the board for a client the log does not go back for
+
+        With `viewport` ({x, y, width, height} of the canvas), only the elements around
+        it are returned with the area searched (`window`), like search_viewport.
+        """
+        self.ensure_one()
+        if not viewport:
+            return {'snapshot': self.element_ids.to_dicts()}
+        res = self.env['whiteboard.element'].search_viewport(self.id, viewport)
+        return {'snapshot': res['elements'], 'window': res['window']}
+
+    def _get_bus_channel(self):
+        """Name of the bus channel the clients subscribe to for the operations of the board,
+        the operations are sent on the board itself, see ir.websocket"""
+        self.ensure_one()
+        return f'whiteboard_board_{self.id}'
+
+    def _lock_version(self):
+        """Lock the board until the end of the transaction, so its versions are applied in order"""
+        self.ensure_one()
+        self.env.cr.execute('SELECT id FROM whiteboard_board WHERE id = %s FOR UPDATE', [self.id])
+        self.invalidate_recordset(['version'])
+
+    def _get_operations_since(self, version, client_id=None):
+        """Logged operations of the other clients after `version`, None when they were purged"""
+        self.ensure_one()
+        if version >= self.version:
+            return []
+
+        Operation = self.env['whiteboard.operation']
+        if not Operation.search_count([('board_id', '=', self.id), ('version', '=', version + 1)], limit=1):
+            return None
+
+        domain = [('board_id', '=', self.id), ('version', '>', version)]
+        if client_id:
+            domain.append(('client_id', '!=', client_id))
+        return Operation.search(domain).to_dicts()
+
+    def _apply_operations(self, operations, client_id=None, base_version=None):
+        """Apply operations to the elements, log them and send them to the other clients
+
+        The updates of the elements deleted since `base_version` are dropped, the
+        updates of the other unknown elements are applied as adds.
+
+        Returns (version, applied operations).
+        """
+        self.ensure_one()
+        Element = self.env['whiteboard.element']
+
+        uids = [str(o['id']) for o in operations if o.get('id')]
+        existing = {
+            element.uid: element
+            for element in Element.search([('board_id', '=', self.id), ('uid', 'in', uids)])
+        }
+
+        # elements deleted by the other clients since the version the client worked on
+        deleted = set()
+        if base_version is not None:
+            unknown = [uid for uid in uids if uid not in existing]
+            if unknown:
+                deleted = set(self.env['whiteboard.operation'].search([
+                    ('board_id', '=', self.id),
+                    ('version', '>', base_version),
+                    ('op_type', '=', 'delete'),
+                    ('element_uid', 'in', unknown),
+                ]).mapped('element_uid'))
+
+        applied = []
+        to_create = {}
+        to_delete = Element
+        for operation in operations:
+            op_type = operation.get('type')
+            uid = str(operation['id']) if operation.get('id') else Element._new_uid()
+            data = dict(operation.get('data') or {}, id=uid)
+            element = existing.get(uid)
+
+            if op_type == 'delete':
+                if element:
+                    to_delete |= element
+                    del existing[uid]
+                elif to_create.pop(uid, None) is None:
+                    continue
+                deleted.add(uid)
+            elif op_type == 'add':
+                if element:
+                    element.write(Element._values_from_dict(data))
+                else:
+                    to_create[uid] = data
+            elif op_type == 'update':
+                if element:
+                    element.write(Element._values_from_dict(Element._merge_data(element.to_dict(), data)))
+                elif uid in to_create:
+                    to_create[uid] = Element._merge_data(to_create[uid], data)
+                elif uid in deleted:
+                    continue
+                else:
+                    # never saved, e.g. its add was lost with a failed request
+                    op_type = 'add'
+                    to_create[uid] = data
+            else:
+                continue
+            applied.append({'type': op_type, 'id': uid, 'data': data})
+
+        to_delete.unlink()
+        Element.create_from_dicts(self.id, list(to_create.values()))
+
+        if not applied:
+            return self.version, applied
+
+        version = self.version + 1
+        self.env['whiteboard.operation'].create([{
+            'board_id': self.id,
+            'version': version,
+            'client_id': client_id,
+            'op_type': operation['type'],
+            'element_uid': operation['id'],
+            'data': json.dumps(operation['data']),
+        } for operation in applied])
+        self.version = version
+
+        self.env['bus.bus']._sendone(self, 'whiteboard/operations', {
+            'boardId': self.id,
+            'baseVersion': version - 1,
+            'version': version,
+            'clientId': client_id,
+            'operations': [dict(operation, version=version) for operation in applied],
+        })
+        return version, applied
+
     @api.model
     def create_from_template(self, template_id):
         """Create a new board from a template"""
@@ -155,10 +430,10 @@ class WhiteboardBoard(models.Model):
         
         values = {
             'name': template_data.get('name', 'New Board'),
-            'board_data': json.dumps({'elements': template_data.get('elements', [])}),
         }
         
         board = self.create(values)
+        self.env['whiteboard.element'].create_from_dicts(board.id, template_data.get('elements', []))
         return board.id
 
     def _get_template_data(self, template_id):
@@ -336,6 +611,9 @@ class WhiteboardElement(models.Model):
     _description = 'Whiteboard Element'
     _order = 'z_index, id'
 
+    # id of the element in the whiteboard app
+    uid = fields.Char(string='Element ID', index=True)
+
     board_id = fields.Many2one(
         'whiteboard.board',
         string='Board',
@@ -345,12 +623,14 @@ class WhiteboardElement(models.Model):
     )
     
     element_type = fields.Selection([
-        ('sticky_note', 'Sticky Note'),
+        ('sticky', 'Sticky Note'),
+        ('sticky_note', 'Sticky Note (Legacy)'),
         ('text', 'Text'),
         ('shape', 'Shape'),
         ('frame', 'Frame'),
         ('connector', 'Connector'),
         ('image', 'Image'),
+        ('group', 'Group'),
     ], string='Type', required=True)
     
     # Position
@@ -383,6 +663,73 @@ class WhiteboardElement(models.Model):
     locked = fields.Boolean(string='Locked', default=False)
     visible = fields.Boolean(string='Visible', default=True)
 
+    # Bounding box, for the viewport searches
+    min_x = fields.Float(string='Min X', compute='_compute_bounding_box', store=True)
+    min_y = fields.Float(string='Min Y', compute='_compute_bounding_box', store=True)
+    max_x = fields.Float(string='Max X', compute='_compute_bounding_box', store=True)
+    max_y = fields.Float(string='Max Y', compute='_compute_bounding_box', store=True)
+
+    _sql_constraints = [
+        ('board_uid_uniq', 'unique(board_id, uid)', 'Element IDs must be unique per board.'),
+    ]
+
+    def init(self):
+        """Index the bounding boxes of the elements by board"""
+        sql.create_index(
+            self.env.cr, 'whiteboard_element_bounding_box_index', self._table,
+            ['board_id', 'min_x', 'max_x', 'min_y', 'max_y'],
+        )
+
+    @api.depends('element_type', 'x', 'y', 'width', 'height', 'properties_data')
+    def _compute_bounding_box(self):
+        for element in self:
+            points = [(element.x, element.y), (element.x + element.width, element.y + element.height)]
+            if element.element_type == 'connector' and element.properties_data:
+                # connectors are drawn between their points, whatever their size
+                try:
+                    properties = json.loads(element.properties_data).get('properties') or {}
+                except (json.JSONDecodeError, TypeError, AttributeError):
+                    properties = {}
+                connector_points = [properties.get('startPoint'), properties.get('endPoint')]
+                if all(isinstance(o, dict) for o in connector_points):
+                    points = [(o.get('x') or 0, o.get('y') or 0) for o in connector_points]
+
+            element.min_x = min(o[0] for o in points)
+            element.min_y = min(o[1] for o in points)
+            element.max_x = max(o[0] for o in points)
+            element.max_y = max(o[1] for o in points)
+
+    @api.model
+    def search_viewport(self, board_id, rect, margin=VIEWPORT_MARGIN):
+        """Get the elements of a board intersecting a rectangle of the canvas
+
+        Returns {elements, window} where window is the rectangle {x, y, width, height}
+        grown by `margin` on each side, the area searched. The window is at most
+        VIEWPORT_MAX_SIZE on each axis, around the center of the rectangle, so a zoomed
+        out viewport never loads the whole board at once.
+        """
+        window = {
+            'x': rect['x'] - margin,
+            'y': rect['y'] - margin,
+            'width': rect['width'] + 2 * margin,
+            'height': rect['height'] + 2 * margin,
+        }
+        for position, size in (('x', 'width'), ('y', 'height')):
+            if window[size] > VIEWPORT_MAX_SIZE:
+                window[position] += (window[size] - VIEWPORT_MAX_SIZE) / 2
+                window[size] = VIEWPORT_MAX_SIZE
+        elements = self.search([
+            ('board_id', '=', board_id),
+            ('min_x', '<=', window['x'] + window['width']),
+            ('max_x', '>=', window['x']),
+            ('min_y', '<=', window['y'] + window['height']),
+            ('max_y', '>=', window['y']),
+        ])
+        return {
+            'elements': elements.to_dicts(),
+            'window': window,
+        }
+
     def to_dict(self):
         """Convert element to dictionary for JSON serialization"""
         self.ensure_one()
@@ -402,7 +749,7 @@ class WhiteboardElement(models.Model):
                 properties = {}
         
         return {
-            'id': str(self.id),
+            'id': self.uid or str(self.id),
             'type': self.element_type,
             'x': self.x,
             'y': self.y,
@@ -418,11 +765,30 @@ class WhiteboardElement(models.Model):
         }
 
     @api.model
-    def create_from_dict(self, board_id, data):
-        """Create element from dictionary data"""
+    def _new_uid(self):
+        """Element id in the format of the whiteboard app"""
+        return 'el_' + uuid.uuid4().hex[:16]
+
+    def to_dicts(self):
+        """Convert elements to dictionaries, in their z-order"""
+        return [element.to_dict() for element in self]
+
+    @api.model
+    def _merge_data(self, data, changes):
+        """Dictionary data of an element updated with the changed keys of `changes`"""
+        merged = dict(data)
+        for key, value in changes.items():
+            if key in ('style', 'properties') and isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = dict(merged[key], **value)
+            else:
+                merged[key] = value
+        return merged
+
+    @api.model
+    def _values_from_dict(self, data):
+        """Field values of an element from its dictionary data"""
         values = {
-            'board_id': board_id,
-            'element_type': data.get('type', 'sticky_note'),
+            'element_type': data.get('type', 'sticky'),
             'x': data.get('x', 0),
             'y': data.get('y', 0),
             'width': data.get('width', 100),
@@ -444,7 +810,60 @@ class WhiteboardElement(models.Model):
             'rotation', 'content', 'style', 'locked', 'visible'
         }
         properties = {k: v for k, v in data.items() if k not in standard_fields}
-        if properties:
-            values['properties_data'] = json.dumps(properties)
+        values['properties_data'] = json.dumps(properties) if properties else False
         
-        return self.create(values)
\ No newline at end of file
+        return values
+
+    @api.model
+    def create_from_dict(self, board_id, data):
+        """Create element from dictionary data"""
+        return self.create_from_dicts(board_id, [data])
+
+    @api.model
+    def create_from_dicts(self, board_id, data_list):
+        """Create elements from dictionary data, in one batch"""
+        return self.create([
+            dict(self._values_from_dict(data), board_id=board_id, uid=str(data['id']) if data.get('id') else self._new_uid())
+            for data in data_list
+        ])
+
+
+class WhiteboardOperation(models.Model):
+    """Whiteboard Operation Model - Log of the changes of the elements, by board version"""
+    _name = 'whiteboard.operation'
+    _description = 'Whiteboard Operation'
+    _order = 'version, id'
+
+    board_id = fields.Many2one(
+        'whiteboard.board',
+        string='Board',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    version = fields.Integer(string='Version', required=True, index=True)
+
+    # whiteboard app instance which made the operation
+    client_id = fields.Char(string='Client ID')
+
+    op_type = fields.Selection([
+        ('add', 'Add'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ], string='Type', required=True)
+    element_uid = fields.Char(string='Element ID', required=True)
+    data = fields.Text(string='Data', help='JSON data of the element or of its changed keys')
+
+    def to_dicts(self):
+        """Convert operations to dictionaries, in the format of apply_operations"""
+        return [{
+            'type': operation.op_type,
+            'id': operation.element_uid,
+            'data': json.loads(operation.data or '{}'),
+            'version': operation.version,
+        } for operation in self]
+
+    @api.autovacuum
+    def _gc_operations(self):
+        """Remove the operations older than OPERATION_RETENTION"""
+        self.search([('create_date', '<', fields.Datetime.now() - OPERATION_RETENTION)]).unlink()
\ No newline at end of file
@@ -48,6 +48,14 @@ export class CanvasCore {
         // History
         this.history = new HistoryManager(50);
         
+        // Sequence of the history snapshots and of the element loads, an undo keeps
+        // the elements loaded after the snapshot it restores
+        this.stateSeq = 0;
+        this.loadedSeq = new Map();
+        
+        // Bounds of all the elements of the board when they are not all loaded
+        this.contentBounds = null;
+        
         // Event callbacks
         this.callbacks = {
             onElementsChange: null,
@@ -167,6 +175,33 @@ export class CanvasCore {
         this._notifyElementsChange();
     }
 
+    /**
+     * Add elements loaded from the server, the ones already on the canvas are kept
+     * @param {Array} elementsData
+     * @returns {Array} Added elements
+     */
+    loadElements(elementsData) {
+        const added = [];
+        for (const data of elementsData) {
+            if (this.elements.has(data.id)) continue;
+            
+            const element = this.createElement(data.type, data);
+            if (element) {
+                this.elements.set(element.id, element);
+                this.elementOrder.push(element.id);
+                this.loadedSeq.set(element.id, ++this.stateSeq);
+                added.push(element);
+            }
+        }
+        
+        if (added.length) {
+            // Keep the z-order of the board
+            this.elementOrder.sort((a, b) => this.elements.get(a).zIndex - this.elements.get(b).zIndex);
+            this._notifyElementsChange();
+        }
+        return added;
+    }
+
     /**
      * Get element by ID
      * @param {string} elementId
@@ -397,6 +432,13 @@ export class CanvasCore {
         let minX = Infinity, minY = Infinity;
         let maxX = -Infinity, maxY = -Infinity;
         
+        if (this.contentBounds) {
+            minX = this.contentBounds.x;
+            minY = this.contentBounds.y;
+            maxX = this.contentBounds.x + this.contentBounds.width;
+            maxY = this.contentBounds.y + this.contentBounds.height;
+        }
+        
         this.elements.forEach(element => {
             const bounds = element.getBounds();
             minX = Math.min(minX, bounds.x);
@@ -455,6 +497,22 @@ export class CanvasCore {
         return { ...this.transform };
     }
 
+    /**
+     * Get the area of the canvas shown in the container
+     * @returns {Object} {x, y, width, height} in canvas coordinates
+     */
+    getViewportRect() {
+        const width = this.container?.clientWidth || 0;
+        const height = this.container?.clientHeight || 0;
+        const topLeft = this.screenToCanvas(0, 0);
+        return {
+            x: topLeft.x,
+            y: topLeft.y,
+            width: width / this.transform.zoom,
+            height: height / this.transform.zoom
+        };
+    }
+
     /**
      * Convert screen coordinates to canvas coordinates
      * @param {number} screenX
@@ -690,7 +748,8 @@ export class CanvasCore {
         return {
             elements: this.getAllElements().map(el => el.toJSON()),
             elementOrder: [...this.elementOrder],
-            selectedIds: Array.from(this.selectedIds)
+            selectedIds: Array.from(this.selectedIds),
+            seq: ++this.stateSeq
         };
     }
 
@@ -699,6 +758,9 @@ export class CanvasCore {
      * @param {Object} state
      */
     _restoreState(state) {
+        // Elements loaded after the snapshot was taken are not part of it
+        const loaded = this.getAllElements().filter(el => this.loadedSeq.get(el.id) > (state.seq || 0));
+        
         // Clear current elements
         this.elements.clear();
         this.elementOrder = [];
@@ -714,6 +776,12 @@ export class CanvasCore {
         
         // Restore order
         this.elementOrder = state.elementOrder.filter(id => this.elements.has(id));
+        for (const element of loaded) {
+            if (!this.elements.has(element.id)) {
+                this.elements.set(element.id, element);
+                this.elementOrder.push(element.id);
+            }
+        }
         
         // Restore selection
         for (const id of state.selectedIds) {
@@ -749,6 +817,7 @@ export class CanvasCore {
         this.clearSelection();
         this.elements.clear();
         this.elementOrder = [];
+        this.loadedSeq.clear();
         
         if (data.elements) {
             for (const elementData of data.elements) {
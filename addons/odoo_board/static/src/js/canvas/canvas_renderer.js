@@ -1,6 +1,6 @@
 /** @odoo-module **/
 
-import { ELEMENT_TYPES } from '../utils/constants';
+import { ELEMENT_TYPES, CANVAS_CONFIG } from '../utils/constants';
 
 /**
  * Canvas Renderer
@@ -277,9 +277,24 @@ export class CanvasRenderer {
         const elements = this.canvas.getAllElements();
         const selectedIds = this.canvas.selectedIds;
         
+        // Only elements around the viewport get a DOM element, the selected ones are
+        // kept for the drag and resize handlers
+        const viewport = this.canvas.getViewportRect();
+        const margin = CANVAS_CONFIG.RENDER_MARGIN / this.canvas.transform.zoom;
+        const renderRect = {
+            x: viewport.x - margin,
+            y: viewport.y - margin,
+            width: viewport.width + margin * 2,
+            height: viewport.height + margin * 2
+        };
+        
         // Separate connectors from other elements
         const connectors = elements.filter(el => el.type === ELEMENT_TYPES.CONNECTOR);
-        const otherElements = elements.filter(el => el.type !== ELEMENT_TYPES.CONNECTOR);
+        // A container not laid out yet has no viewport, everything is rendered
+        const culled = viewport.width > 0 && viewport.height > 0;
+        const otherElements = elements.filter(el =>
+            el.type !== ELEMENT_TYPES.CONNECTOR && (!culled || el.intersects(renderRect) || selectedIds.has(el.id))
+        );
         
         // Render connectors in SVG layer
         this._renderConnectors(connectors, selectedIds);
@@ -117,7 +117,14 @@ export const CANVAS_CONFIG = {
     GRID_SIZE: 20,
     SNAP_THRESHOLD: 10,
     DEFAULT_ZOOM: 1,
-    SCROLL_ZOOM_SENSITIVITY: 0.001
+    SCROLL_ZOOM_SENSITIVITY: 0.001,
+    // Large boards are loaded by tiles of the canvas as it is panned
+    TILE_SIZE: 2000,
+    TILE_LOAD_DELAY: 150,
+    // Tiles loaded at most per axis and request, within VIEWPORT_MAX_SIZE of the server
+    TILE_LOAD_MAX: 5,
+    // Screen pixels around the viewport where elements are rendered
+    RENDER_MARGIN: 200
 };
 
 export const ELEMENT_DEFAULTS = {
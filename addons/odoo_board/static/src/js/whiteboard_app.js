@@ -8,9 +8,9 @@ import { Minimap } from './components/minimap';
 import { ContextMenu } from './components/context_menu';
 import { PropertiesPanel } from './components/properties_panel';
 import { TemplatePicker } from './components/template_picker';
-import { TOOLS, ELEMENT_TYPES, ALIGNMENT } from './utils/constants';
+import { TOOLS, ELEMENT_TYPES, ALIGNMENT, CANVAS_CONFIG } from './utils/constants';
 import { getIcon } from './utils/icons';
-import { getBoundingBox } from './utils/geometry';
+import { getBoundingBox, generateId } from './utils/geometry';
 
 /**
  * Main Whiteboard Application
@@ -56,6 +56,21 @@ export class WhiteboardApp {
         this.isDirty = false;
         this.autoSaveTimer = null;
         
+        // Serialized elements as last saved, saves only send the difference
+        this.savedElements = new Map();
+        
+        // Sync state: version of the board the elements are at, id of this app in the
+        // operation log and queue running the syncs one at a time
+        this.version = 0;
+        this.clientId = generateId();
+        this.syncQueue = Promise.resolve();
+        
+        // Windowed loading: the elements of a large board are loaded by tiles of
+        // the canvas as they are shown, see _loadVisibleTiles
+        this.windowed = false;
+        this.loadedTiles = new Set();
+        this.tileLoadTimer = null;
+        
         // RPC function (will be set by Odoo component)
         this.rpc = options.rpc || null;
         
@@ -216,6 +231,7 @@ export class WhiteboardApp {
             this._renderZoomControls();
             this.renderer.requestRender();
             this.minimap?.update();
+            this._scheduleTileLoad();
         });
 
         this.canvas.on('onHistoryChange', (info) => {
@@ -694,7 +710,7 @@ export class WhiteboardApp {
                 model: 'whiteboard.board',
                 method: 'get_board_data',
                 args: [boardId],
-                kwargs: {}
+                kwargs: { viewport: this.getViewportSize() }
             });
             
             if (result) {
@@ -708,14 +724,7 @@ export class WhiteboardApp {
                 }
                 
                 // Load elements
-                if (result.elements) {
-                    this.canvas.importData({
-                        elements: result.elements,
-                        transform: result.canvasState
-                    });
-                }
-                
-                this.isDirty = false;
+                this.importBoard(result);
             }
         } catch (error) {
             console.error('Failed to load board:', error);
@@ -733,9 +742,10 @@ export class WhiteboardApp {
         }
         
         try {
+            await this.pushOperations();
+            
             const data = {
                 name: this.boardName,
-                elements: this.canvas.exportData().elements,
                 canvasState: this.canvas.getTransform()
             };
             
@@ -759,6 +769,426 @@ export class WhiteboardApp {
         }
     }
 
+    /**
+     * Serialize the elements of the canvas
+     * @returns {Map} element id => JSON string
+     */
+    _serializeElements() {
+        const elements = new Map();
+        for (const element of this.canvas.getAllElements()) {
+            elements.set(element.id, JSON.stringify(element.toJSON()));
+        }
+        return elements;
+    }
+
+    /**
+     * Get the operations on the elements since the last save
+     * @param {Map} elements - Serialized elements, see _serializeElements
+     * @returns {Array} [{type: 'add'|'update'|'delete', id, data}]
+     */
+    _getElementOperations(elements) {
+        const operations = [];
+        elements.forEach((json, id) => {
+            const savedJson = this.savedElements.get(id);
+            if (savedJson === undefined) {
+                operations.push({ type: 'add', id, data: JSON.parse(json) });
+            } else if (savedJson !== json) {
+                operations.push({
+                    type: 'update',
+                    id,
+                    data: this._getChangedKeys(JSON.parse(savedJson), JSON.parse(json))
+                });
+            }
+        });
+        this.savedElements.forEach((json, id) => {
+            if (!elements.has(id)) {
+                operations.push({ type: 'delete', id });
+            }
+        });
+        return operations;
+    }
+
+    /**
+     * Get the keys of an element changed since it was saved
+     * @param {Object} saved - Element data as last saved
+     * @param {Object} current - Element data
+     * @returns {Object} Changed keys, only the changed ones of style and properties
+     */
+    _getChangedKeys(saved, current) {
+        const changes = {};
+        for (const [key, value] of Object.entries(current)) {
+            if (JSON.stringify(value) === JSON.stringify(saved[key])) continue;
+            
+            if ((key === 'style' || key === 'properties') && saved[key] && value) {
+                changes[key] = this._getChangedKeys(saved[key], value);
+            } else {
+                changes[key] = value;
+            }
+        }
+        return changes;
+    }
+
+    /**
+     * Merge changed keys into element data, like the server does
+     * @param {Object} data - Element data
+     * @param {Object} changes - Changed keys
+     * @returns {Object}
+     */
+    _mergeData(data, changes) {
+        const merged = { ...data };
+        for (const [key, value] of Object.entries(changes)) {
+            if ((key === 'style' || key === 'properties') && merged[key] && value && typeof value === 'object') {
+                merged[key] = { ...merged[key], ...value };
+            } else {
+                merged[key] = value;
+            }
+        }
+        return merged;
+    }
+
+    // ==================== Sync ====================
+
+    /**
+     * Load the elements of a board, see get_board_data of whiteboard.board
+     * @param {Object} board - {elements, canvasState, version}
+     */
+    importBoard(board) {
+        // Only the elements around the viewport were loaded, the tiles shown
+        // partly loaded are completed once the transform is imported
+        this.windowed = Boolean(board.window);
+        this.loadedTiles = new Set();
+        this.canvas.contentBounds = board.bounds || null;
+        if (this.windowed) {
+            this._markTilesLoaded(board.window);
+        }
+        
+        this.canvas.importData({
+            elements: board.elements || [],
+            transform: board.canvasState
+        });
+        
+        this.savedElements = this._serializeElements();
+        this.version = board.version || 0;
+        this.isDirty = false;
+        
+        // A zoomed out viewport is larger than the window loaded with the board
+        if (this.windowed) {
+            this._scheduleTileLoad();
+        }
+    }
+
+    // ==================== Windowed Loading ====================
+
+    /**
+     * Get the size of the canvas, to load the elements it shows
+     * @returns {Object} {width, height} in pixels
+     */
+    getViewportSize() {
+        return {
+            width: this.canvasContainer?.clientWidth || window.innerWidth,
+            height: this.canvasContainer?.clientHeight || window.innerHeight
+        };
+    }
+
+    /**
+     * Load the tiles shown once the canvas stops moving
+     */
+    _scheduleTileLoad() {
+        if (!this.windowed || !this.rpc || !this.boardId) return;
+        
+        clearTimeout(this.tileLoadTimer);
+        this.tileLoadTimer = setTimeout(() => {
+            this._loadVisibleTiles().catch(error => {
+                console.error('Failed to load elements:', error);
+            });
+        }, CANVAS_CONFIG.TILE_LOAD_DELAY);
+    }
+
+    /**
+     * Get the tiles of the canvas overlapping a rectangle
+     * @param {Object} rect - {x, y, width, height} in canvas coordinates
+     * @returns {Object} {minX, minY, maxX, maxY} tile coordinates
+     */
+    _getTileRange(rect) {
+        const size = CANVAS_CONFIG.TILE_SIZE;
+        return {
+            minX: Math.floor(rect.x / size),
+            minY: Math.floor(rect.y / size),
+            maxX: Math.floor((rect.x + rect.width) / size),
+            maxY: Math.floor((rect.y + rect.height) / size)
+        };
+    }
+
+    /**
+     * Mark the tiles inside a searched rectangle as loaded
+     * @param {Object} rect - {x, y, width, height} in canvas coordinates
+     */
+    _markTilesLoaded(rect) {
+        const size = CANVAS_CONFIG.TILE_SIZE;
+        // Tiles only partly inside the rectangle were not fully searched
+        const range = this._getTileRange(rect);
+        for (let tx = range.minX; tx <= range.maxX; tx++) {
+            for (let ty = range.minY; ty <= range.maxY; ty++) {
+                if (tx * size >= rect.x && ty * size >= rect.y &&
+                    (tx + 1) * size <= rect.x + rect.width && (ty + 1) * size <= rect.y + rect.height) {
+                    this.loadedTiles.add(`${tx}:${ty}`);
+                }
+            }
+        }
+    }
+
+    /**
+     * Get the first tile shown which is not loaded yet
+     * @returns {Object|null} {x, y} tile coordinates
+     */
+    _getMissingTile() {
+        const range = this._getTileRange(this.canvas.getViewportRect());
+        for (let tx = range.minX; tx <= range.maxX; tx++) {
+            for (let ty = range.minY; ty <= range.maxY; ty++) {
+                if (!this.loadedTiles.has(`${tx}:${ty}`)) {
+                    return { x: tx, y: ty };
+                }
+            }
+        }
+        return null;
+    }
+
+    /**
+     * Load the elements of the tiles shown which are not loaded yet, by parts of
+     * TILE_LOAD_MAX tiles per axis starting at the first missing tile
+     * @returns {Promise}
+     */
+    _loadVisibleTiles() {
+        return this._enqueueSync(async () => {
+            const tile = this._getMissingTile();
+            if (!tile) return;
+            
+            const range = this._getTileRange(this.canvas.getViewportRect());
+            const missing = {
+                minX: tile.x,
+                minY: tile.y,
+                maxX: Math.min(range.maxX, tile.x + CANVAS_CONFIG.TILE_LOAD_MAX - 1),
+                maxY: Math.min(range.maxY, tile.y + CANVAS_CONFIG.TILE_LOAD_MAX - 1)
+            };
+            
+            const size = CANVAS_CONFIG.TILE_SIZE;
+            const result = await this.rpc('/web/dataset/call_kw', {
+                model: 'whiteboard.element',
+                method: 'search_viewport',
+                args: [this.boardId, {
+                    x: missing.minX * size,
+                    y: missing.minY * size,
+                    width: (missing.maxX - missing.minX + 1) * size,
+                    height: (missing.maxY - missing.minY + 1) * size
+                }],
+                kwargs: {}
+            });
+            if (!result) return;
+            
+            // Elements already loaded keep their local changes, and the ones deleted
+            // locally but not pushed yet are still known until the next push
+            const elements = result.elements.filter(data => !this.savedElements.has(data.id));
+            for (const element of this.canvas.loadElements(elements)) {
+                this.savedElements.set(element.id, JSON.stringify(element.toJSON()));
+            }
+            this._markTilesLoaded(result.window);
+            
+            if (this._getMissingTile()) {
+                this._scheduleTileLoad();
+            }
+        });
+    }
+
+    /**
+     * Run a sync after the running ones, so versions are applied in order
+     * @param {Function} callback - Async function
+     * @returns {Promise}
+     */
+    _enqueueSync(callback) {
+        const promise = this.syncQueue.then(callback);
+        this.syncQueue = promise.catch(() => {});
+        return promise;
+    }
+
+    /**
+     * Send the operations since the last save, apply the ones of the other clients
+     * @returns {Promise}
+     */
+    pushOperations() {
+        return this._enqueueSync(() => this._syncOperations(false));
+    }
+
+    /**
+     * Send the local operations if any and apply the ones of the other clients, the
+     * local operations are always sent first so a snapshot never drops them
+     * @param {boolean} pull - Get the operations of the other clients without local ones
+     * @returns {Promise}
+     */
+    async _syncOperations(pull) {
+        const elements = this._serializeElements();
+        const operations = this._getElementOperations(elements);
+        if (!operations.length && !pull) return;
+        
+        // A snapshot of a windowed board is only loaded around the viewport
+        const kwargs = { viewport: this.windowed ? this.canvas.getViewportRect() : null };
+        const result = await this.rpc('/web/dataset/call_kw', operations.length ? {
+            model: 'whiteboard.board',
+            method: 'apply_operations',
+            args: [this.boardId, this.version, operations, this.clientId],
+            kwargs
+        } : {
+            model: 'whiteboard.board',
+            method: 'get_operations',
+            args: [this.boardId, this.version, this.clientId],
+            kwargs
+        });
+        
+        if (operations.length) {
+            this.savedElements = elements;
+        }
+        if (result) {
+            this._applySyncResult(result, operations);
+        }
+    }
+
+    /**
+     * Get the operations of the other clients missed since the loaded version
+     * @returns {Promise}
+     */
+    pullOperations() {
+        return this._enqueueSync(() => this._syncOperations(true));
+    }
+
+    /**
+     * Handle the operations sent on the bus by the server
+     * @param {Object} payload - {boardId, baseVersion, version, clientId, operations}
+     * @returns {Promise}
+     */
+    onRemoteOperations(payload) {
+        if (payload.boardId !== this.boardId || payload.clientId === this.clientId) {
+            return Promise.resolve();
+        }
+        
+        return this._enqueueSync(async () => {
+            if (payload.version <= this.version) return;
+            
+            if (payload.baseVersion > this.version) {
+                // Notifications were missed, catch up from the log
+                await this._syncOperations(true);
+                return;
+            }
+            
+            this._applyOperations(payload.operations);
+            this.version = payload.version;
+        });
+    }
+
+    /**
+     * Apply the result of apply_operations or get_operations
+     * @param {Object} result - {version, operations} or {version, snapshot}
+     * @param {Array} pushed - Operations just applied by the server, after the missed ones
+     */
+    _applySyncResult(result, pushed = []) {
+        if (result.snapshot) {
+            // The log does not go back to our version, reload the elements, only the
+            // ones around the viewport for a windowed board
+            this.canvas.importData({ elements: result.snapshot });
+            this.savedElements = this._serializeElements();
+            if (this.windowed && result.window) {
+                this.loadedTiles = new Set();
+                this._markTilesLoaded(result.window);
+                this._scheduleTileLoad();
+            }
+        } else {
+            const missed = result.operations.filter(op => op.version > this.version);
+            this._applyOperations(this._rebaseOperations(missed, pushed));
+        }
+        this.version = Math.max(this.version, result.version);
+    }
+
+    /**
+     * Get the missed operations as the server applied them, before our pushed ones:
+     * what our operations wrote wins, like on the server
+     * @param {Array} missed - Operations of the other clients
+     * @param {Array} pushed - Our operations, applied after them by the server
+     * @returns {Array}
+     */
+    _rebaseOperations(missed, pushed) {
+        if (!pushed.length) return missed;
+        
+        const pushedById = new Map(pushed.map(op => [op.id, op]));
+        const operations = [];
+        for (const op of missed) {
+            const own = pushedById.get(op.id);
+            if (!own) {
+                operations.push(op);
+            } else if (own.type !== 'update') {
+                // Our add replaced the element, our delete removed it
+                continue;
+            } else if (op.type === 'delete') {
+                // The server drops the updates of the elements deleted meanwhile
+                operations.push(op);
+            } else if (op.type === 'add') {
+                operations.push({ ...op, data: this._mergeData(op.data, own.data) });
+            } else {
+                const data = this._getUnwrittenKeys(op.data, own.data);
+                if (Object.keys(data).length) {
+                    operations.push({ ...op, data });
+                }
+            }
+        }
+        return operations;
+    }
+
+    /**
+     * Get the changed keys of an update not written by another update
+     * @param {Object} changes - Changed keys
+     * @param {Object} written - Changed keys written after them
+     * @returns {Object} Keys of changes not in written, nested for style and properties
+     */
+    _getUnwrittenKeys(changes, written) {
+        const unwritten = {};
+        for (const [key, value] of Object.entries(changes)) {
+            if (!(key in written)) {
+                unwritten[key] = value;
+            } else if ((key === 'style' || key === 'properties') && value && typeof value === 'object'
+                    && written[key] && typeof written[key] === 'object') {
+                const nested = this._getUnwrittenKeys(value, written[key]);
+                if (Object.keys(nested).length) {
+                    unwritten[key] = nested;
+                }
+            }
+        }
+        return unwritten;
+    }
+
+    /**
+     * Apply operations of the other clients, local changes not saved yet are kept
+     * @param {Array} operations
+     */
+    _applyOperations(operations) {
+        for (const op of operations) {
+            if (op.type === 'delete') {
+                this.canvas.removeElement(op.id, false);
+                this.savedElements.delete(op.id);
+            } else if (op.type === 'add') {
+                const element = this.canvas.createElement(op.data.type, op.data);
+                if (!element) continue;
+                
+                this.canvas.removeElement(op.id, false);
+                this.canvas.addElement(element, false);
+                this.savedElements.set(op.id, JSON.stringify(element.toJSON()));
+            } else if (op.type === 'update' && this.canvas.getElement(op.id)) {
+                this.canvas.updateElement(op.id, op.data, false);
+                
+                const savedJson = this.savedElements.get(op.id);
+                if (savedJson !== undefined) {
+                    this.savedElements.set(op.id, JSON.stringify(this._mergeData(JSON.parse(savedJson), op.data)));
+                }
+            }
+        }
+    }
+
     /**
      * Export board as image
      * @param {string} format - 'png' or 'svg'
@@ -839,6 +1269,7 @@ export class WhiteboardApp {
         if (this.autoSaveTimer) {
             clearInterval(this.autoSaveTimer);
         }
+        clearTimeout(this.tileLoadTimer);
         
         // Destroy components
         this.renderer?.destroy();
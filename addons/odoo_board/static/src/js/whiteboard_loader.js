@@ -23,6 +23,7 @@ export class WhiteboardView extends Component {
         this.orm = useService("orm");
         this.notification = useService("notification");
         this.action = useService("action");
+        this.busService = useService("bus_service");
 
         this.state = useState({
             loading: false,
@@ -32,6 +33,8 @@ export class WhiteboardView extends Component {
         });
 
         this.whiteboardApp = null;
+        this.busChannel = null;
+        this._onRemoteOperations = (payload) => this.whiteboardApp?.onRemoteOperations(payload);
 
         // Get board ID from action context or params
         const context = this.props.action?.context || {};
@@ -103,17 +106,18 @@ export class WhiteboardView extends Component {
 
             console.log('Loading board data for ID:', this.state.boardId);
             // Load board data
-            const boards = await this.orm.read('whiteboard.board', [this.state.boardId], ['name', 'board_data', 'canvas_state']);
-            console.log('Board data loaded:', boards);
+            const board = await this.orm.call('whiteboard.board', 'get_board_data', [this.state.boardId], {
+                viewport: this.whiteboardApp?.getViewportSize(),
+            });
+            console.log('Board data loaded:', board);
 
-            if (!boards || boards.length === 0) {
+            if (!board) {
                 console.error('Board not found');
                 this.state.error = 'Board not found';
                 this.state.loading = false;
                 return;
             }
 
-            const board = boards[0];
             this.state.boardName = board.name;
             console.log('Board name:', board.name);
 
@@ -139,21 +143,16 @@ export class WhiteboardView extends Component {
             }
 
             // Load existing board data
-            if (board.board_data) {
-                console.log('Loading existing board data...');
-                try {
-                    const boardData = JSON.parse(board.board_data);
-                    const canvasState = board.canvas_state ? JSON.parse(board.canvas_state) : null;
-                    console.log('Parsed board data:', boardData);
-                    this.whiteboardApp.canvas.importData({
-                        elements: boardData.elements || [],
-                        transform: canvasState
-                    });
-                    console.log('Imported board data into canvas');
-                } catch (e) {
-                    console.error('Failed to parse board data:', e);
-                }
-            }
+            console.log('Loading existing board data...');
+            this.whiteboardApp.importBoard(board);
+            console.log('Imported board data into canvas');
+
+            // Receive the changes of the other users, then catch up with the ones
+            // made since the board was read
+            this.busChannel = board.channel;
+            this.busService.addChannel(this.busChannel);
+            this.busService.subscribe('whiteboard/operations', this._onRemoteOperations);
+            await this.whiteboardApp.pullOperations();
 
             console.log('Whiteboard initialization completed successfully');
             this.state.loading = false;
@@ -181,12 +180,16 @@ export class WhiteboardView extends Component {
      * Destroy whiteboard
      */
     _destroyWhiteboard() {
+        if (this.busChannel) {
+            this.busService.unsubscribe('whiteboard/operations', this._onRemoteOperations);
+            this.busService.deleteChannel(this.busChannel);
+            this.busChannel = null;
+        }
         if (this.whiteboardApp) {
-            // Auto-save before destroying
-            if (this.whiteboardApp.isDirty) {
-                this._saveBoard();
-            }
-            this.whiteboardApp.destroy();
+            const whiteboardApp = this.whiteboardApp;
+            // Auto-save before destroying, the save reads the canvas
+            const saved = whiteboardApp.isDirty ? this._saveBoard() : Promise.resolve();
+            saved.finally(() => whiteboardApp.destroy());
             this.whiteboardApp = null;
         }
     }
@@ -195,17 +198,19 @@ export class WhiteboardView extends Component {
      * Save board to server
      */
     async _saveBoard() {
-        if (!this.whiteboardApp || !this.state.boardId) return;
+        const whiteboardApp = this.whiteboardApp;
+        if (!whiteboardApp || !this.state.boardId) return;
         
         try {
-            const data = this.whiteboardApp.getBoardData();
-            await this.orm.write('whiteboard.board', [this.state.boardId], {
+            const data = whiteboardApp.getBoardData();
+            // Only the operations on the elements since the last save are sent
+            await whiteboardApp.pushOperations();
+            await this.orm.call('whiteboard.board', 'save_board_data', [this.state.boardId, {
                 name: data.name,
-                board_data: JSON.stringify({ elements: data.elements }),
-                canvas_state: JSON.stringify(data.transform),
-            });
+                canvasState: data.transform,
+            }]);
             
-            this.whiteboardApp.isDirty = false;
+            whiteboardApp.isDirty = false;
             
             this.notification.add(this.env._t('Board saved'), {
                 type: 'success',
@@ -296,11 +301,9 @@ export class WhiteboardFormWidget extends Component {
         if (!boardId || !this.whiteboardApp) return;
 
         // Load board data
-        const boards = await this.orm.read('whiteboard.board', [boardId], ['name', 'board_data', 'canvas_state']);
-
-        if (!boards || boards.length === 0) return;
+        const board = await this.orm.call('whiteboard.board', 'get_board_data', [boardId]);
 
-        const board = boards[0];
+        if (!board) return;
 
         // Update whiteboard app with board info
         this.whiteboardApp.options.boardId = boardId;
@@ -309,18 +312,7 @@ export class WhiteboardFormWidget extends Component {
         this.whiteboardApp.boardName = board.name;
 
         // Load existing board data
-        if (board.board_data) {
-            try {
-                const boardData = JSON.parse(board.board_data);
-                const canvasState = board.canvas_state ? JSON.parse(board.canvas_state) : null;
-                this.whiteboardApp.canvas.importData({
-                    elements: boardData.elements || [],
-                    transform: canvasState
-                });
-            } catch (e) {
-                console.error('Failed to parse board data:', e);
-            }
-        }
+        this.whiteboardApp.importBoard(board);
     }
 }
 
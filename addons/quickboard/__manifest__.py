@@ -12,6 +12,7 @@
     'data': [
         'security/quickboard_security.xml',
         'security/ir.model.access.csv',
+        'data/quickboard_cron.xml',
         'views/quickboard_views.xml',
         'views/quickboard_item_views.xml',
         'wizard/quickboard_generator_views.xml'
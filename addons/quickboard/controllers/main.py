@@ -1,94 +1,22 @@
 # -*- coding: utf-8 -*-
-from ast import literal_eval
+import logging
 
-from odoo import http, fields, models
+from odoo import SUPERUSER_ID, api, http
 from odoo.http import request
-from odoo.osv import expression
+
+from ..models.quickboard_cache import quickboard_cache
+
+_logger = logging.getLogger(__name__)
+
+# seconds, a pathological group of tiles is cancelled by postgres instead of spinning forever
+QUICKBOARD_STREAM_TIMEOUT = 30
 
 class QuickboardController(http.Controller):
     def get_quickboard_item_values(self, quickboard_item, start_date=None, end_date=None, with_data=False):
-        vals = {
-                'id': quickboard_item.id,
-                'name': quickboard_item.name,
-                'model_name': quickboard_item.model_name,
-                'icon': quickboard_item.icon,
-                'type': quickboard_item.type,
-                'chart_type': quickboard_item.chart_type,
-                'height': quickboard_item.height,
-                'width': quickboard_item.width,
-                'x_pos': quickboard_item.x_pos,
-                'y_pos': quickboard_item.y_pos,
-                'value_field_name': quickboard_item.value_field_id.display_name,
-                'value_field_type': quickboard_item.value_field_id.ttype,
-                'dimension_field_name': quickboard_item.dimension_field_id.display_name,
-                'dimension_field_type': quickboard_item.dimension_field_id.ttype,
-                'datetime_granularity': quickboard_item.datetime_granularity,
-                'list_row_limit': quickboard_item.list_row_limit,
-                'aggregate_function': quickboard_item.aggregate_function,
-                'text_color': quickboard_item.text_color,
-                'background_color': quickboard_item.background_color
-            }
+        vals = quickboard_item._get_quickboard_values()
 
         if with_data:
-            domain = []
-            if start_date:
-                sd = fields.Datetime.from_string(start_date)
-                domain.append(("create_date", ">", sd))
-
-            if end_date:
-                ed = fields.Datetime.from_string(end_date)
-                domain.append(("create_date", "<", ed))
-
-            if quickboard_item.domain_filter and quickboard_item.domain_filter != "":
-                filter = expression.AND([literal_eval(quickboard_item.domain_filter)])
-                domain = expression.AND([domain, filter])
-
-            if quickboard_item.type == "basic":
-                aggregate_value = 0
-                aggr_func = f"{quickboard_item.value_field_id.name}:{quickboard_item.aggregate_function}"
-
-                agg = request.env[quickboard_item.model_name].sudo()._read_group(
-                    domain=domain,
-                    groupby=[],
-                    aggregates=[aggr_func]
-                )
-                aggregate_value = agg[0][0] if agg[0][0] else 0
-                vals.update({ 'aggregate_value': aggregate_value })
-            else:
-                data = []
-
-                aggr_func = f"{quickboard_item.value_field_id.name}:{quickboard_item.aggregate_function}"
-                group_by = quickboard_item.dimension_field_id.name
-                if quickboard_item.dimension_field_id.ttype in ["date", "datetime"]:
-                    group_by = f"{group_by}:{quickboard_item.datetime_granularity}"
-
-                limit = quickboard_item.list_row_limit if quickboard_item.type == "list" else None
-                order = f"{aggr_func} desc" if quickboard_item.type == "list" else None
-                aggs = request.env[quickboard_item.model_name].sudo()._read_group(
-                    domain=domain,
-                    groupby=[group_by],
-                    aggregates=[aggr_func],
-                    limit=limit,
-                    order=order
-                )
-
-                # seq is to ease t-foreach on the javascript part because it needs t-key
-                for seq, agg in enumerate(aggs, start=1):
-                    if isinstance(agg[0], models.Model):
-                        if agg[0]:
-                            x_data = agg[0].name
-                        else:
-                            x_data = "N/A"
-                    else:
-                        x_data = agg[0]
-
-                    data.append({
-                            "seq": seq,
-                            "x":  x_data,
-                            "y": agg[1]
-                        })
-
-                vals.update({'data': data})
+            vals.update(quickboard_item._get_quickboard_data(start_date, end_date)[quickboard_item.id])
 
         return vals
 
@@ -98,23 +26,115 @@ class QuickboardController(http.Controller):
         vals = self.get_quickboard_item_values(quickboard_item, start_date, end_date, True)
         return vals
 
+    @http.route('/quickboard/items_data', type='json', auth='user', website=True)
+    def get_quickboard_items_data(self, item_ids, start_date=None, end_date=None):
+        quickboard_items = request.env['quickboard.item'].with_context({"hide_model": True}).search([("id", "in", item_ids)])
+        items_data = quickboard_items._get_quickboard_data(start_date, end_date)
+
+        res = []
+        for quickboard_item in quickboard_items:
+            vals = self.get_quickboard_item_values(quickboard_item, start_date, end_date, False)
+            vals.update(items_data[quickboard_item.id])
+            res.append(vals)
+        return res
+
+    def _get_stream_groups(self, quickboard_items):
+        """Items grouped by model, smallest tables first so the fast tiles are not held back
+        by a slow one. The sizes are the estimates of the planner, no table is scanned."""
+        groups = quickboard_items.grouped("model_name")
+        tables = {model_name: request.env[model_name]._table for model_name in groups}
+        request.env.cr.execute(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY(%s)",
+            [list(tables.values())]
+        )
+        sizes = dict(request.env.cr.fetchall())
+        return sorted(groups.items(), key=lambda group: sizes.get(tables[group[0]], 0))
+
+    def _send_stream_notifications(self, partner_id, notifications):
+        # in a transaction of their own, the request one is only committed at its end
+        with request.env.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            partner = env['res.partner'].browse(partner_id)
+            for vals in notifications:
+                env['bus.bus']._sendone(partner, 'quickboard_item_data', vals)
+
+    @http.route('/quickboard/items_stream', type='json', auth='user', website=True)
+    def stream_quickboard_items(self, request_id, item_ids, start_date=None, end_date=None):
+        """Compute the items data like items_data, one model at a time. The items of each model
+        are pushed through the bus as 'quickboard_item_data' notifications as soon as they are
+        ready, the models with the smallest tables first."""
+        quickboard_items = request.env['quickboard.item'].with_context({"hide_model": True}).search([("id", "in", item_ids)])
+        cr = request.env.cr
+        partner_id = request.env.user.partner_id.id
+
+        # a pathological group is cancelled by postgres, the other ones are still sent
+        cr.execute("SET LOCAL statement_timeout = %s", [QUICKBOARD_STREAM_TIMEOUT * 1000])
+        for model_name, model_items in self._get_stream_groups(quickboard_items):
+            try:
+                with cr.savepoint():
+                    items_data = model_items._get_quickboard_data(start_date, end_date)
+            except Exception as e:
+                _logger.warning("Unable to compute quickboard items of %s: %s", model_name, e)
+                # send the definitions anyway so the tiles stop waiting and show no data
+                items_data = {
+                    o.id: {'aggregate_value': False} if o.type == "basic" else {'data': []}
+                    for o in model_items
+                }
+                for data in items_data.values():
+                    data['error'] = str(e)
+
+            notifications = []
+            for quickboard_item in model_items:
+                vals = self.get_quickboard_item_values(quickboard_item, start_date, end_date, False)
+                vals.update(items_data[quickboard_item.id])
+                vals['request_id'] = request_id
+                notifications.append(vals)
+            # only the requesting user gets the figures, not everyone listening on the channel
+            self._send_stream_notifications(partner_id, notifications)
+
+        return quickboard_items.ids
+
     @http.route('/quickboard/item_defs', type='json', auth='user', website=True)
-    def get_quickboard_items(self):
-        items = []
-        for quickboard_item in request.env['quickboard.item'].with_context({"hide_model": True}).search([], order="id"):
-            vals = self.get_quickboard_item_values(quickboard_item, None, None, False)
-            items.append(vals)
-        return items
+    def get_quickboard_items(self, etag=None):
+        """Definitions of the items. When called with an etag (possibly empty) the definitions
+        are returned along with their etag, or only not_modified if the given etag is current."""
+        quickboard_item = request.env['quickboard.item'].with_context({"hide_model": True})
+        if etag is None:
+            return quickboard_item.search([], order="id")._read_quickboard_values()
+
+        current_etag = quickboard_item._get_quickboard_defs_etag()
+        if etag == current_etag:
+            return {'etag': current_etag, 'not_modified': True}
+
+        cache_key = ("item_defs", request.env.cr.dbname, current_etag)
+        items = quickboard_cache.get(cache_key)
+        if items is None:
+            items = quickboard_item.search([], order="id")._read_quickboard_values()
+            quickboard_cache.set('quickboard.item', cache_key, items)
+        return {'etag': current_etag, 'items': items}
 
     @http.route('/quickboard/save_layout', type='json', auth='user', website=True)
     def save_layout(self, layout):
+        positions = {}
         for item in layout:
-            quickboard_item = request.env["quickboard.item"].with_context({"hide_model": True}).search([("id", "=", item["id"])], limit=1)
-            quickboard_item.update({
-                    "x_pos": item["x"],
-                    "y_pos": item["y"],
-                    "height": item["h"] if "h" in item else 0,
-                    "width": item["w"] if "w" in item else 0
-                })
-        return True
+            positions[int(item["id"])] = {
+                "x_pos": item["x"],
+                "y_pos": item["y"],
+                "height": item["h"] if "h" in item else 0,
+                "width": item["w"] if "w" in item else 0
+            }
+
+        quickboard_items = request.env["quickboard.item"].with_context({"hide_model": True}).search([("id", "in", list(positions))])
 
+        # only write the moved tiles, tiles ending up with the same values are written together
+        to_write = {}
+        for quickboard_item in quickboard_items:
+            vals = positions[quickboard_item.id]
+            if any(quickboard_item[k] != v for k, v in vals.items()):
+                key = tuple(sorted(vals.items()))
+                to_write.setdefault(key, quickboard_item.browse())
+                to_write[key] |= quickboard_item
+
+        for key, items in to_write.items():
+            items.write(dict(key))
+        return True
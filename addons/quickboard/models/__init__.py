@@ -1,3 +1,8 @@
 # -*- coding: utf-8 -*-
+from . import quickboard_cache
 from . import quickboard_item
-
+from . import quickboard_item_rollup
+from . import quickboard_live
+from . import quickboard_ai_cache
+from . import quickboard_ai_job
+from . import ir_http
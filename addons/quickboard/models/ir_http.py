@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools import str2bool
+
+class IrHttp(models.AbstractModel):
+    _inherit = "ir.http"
+
+    def session_info(self):
+        res = super().session_info()
+        # when enabled the dashboard receives its tiles data through the bus as they are computed
+        res["quickboard_streaming"] = str2bool(
+            self.env["ir.config_parameter"].sudo().get_param("quickboard.streaming", "False")
+        )
+        return res
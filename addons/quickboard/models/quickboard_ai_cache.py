@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+
+from odoo import api, fields, models
+
+# number of answers kept, the least recently used ones are removed beyond it
+QUICKBOARD_AI_CACHE_SIZE = 200
+# answers bigger than this (in characters) are not worth keeping
+QUICKBOARD_AI_CACHE_MAX_VALUE = 200000
+
+class QuickboardAiCache(models.Model):
+    """Validated answers of the AI generator, addressed by a hash of everything the
+    answer depends on (prompt, model schemas, llm and its settings)."""
+    _name = "quickboard.ai.cache"
+    _description = "Quickboard AI Cache"
+    _order = "last_used desc"
+
+    key = fields.Char(string="Key", required=True, index=True)
+    value = fields.Text(string="Value")
+    last_used = fields.Datetime(string="Last Used", default=fields.Datetime.now)
+    hit_count = fields.Integer(string="Hits", default=0)
+
+    _sql_constraints = [
+        ("key_uniq", "unique(key)", "The cache key must be unique."),
+    ]
+
+    @api.model
+    def _make_key(self, *parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    @api.model
+    def _get(self, key):
+        entry = self.sudo().search([("key", "=", key)], limit=1)
+        if not entry:
+            return None
+        entry.write({"last_used": fields.Datetime.now(), "hit_count": entry.hit_count + 1})
+        return entry.value
+
+    @api.model
+    def _put(self, key, value):
+        if len(value) > QUICKBOARD_AI_CACHE_MAX_VALUE:
+            return
+
+        cache = self.sudo()
+        entry = cache.search([("key", "=", key)], limit=1)
+        if entry:
+            entry.write({"value": value, "last_used": fields.Datetime.now()})
+        else:
+            cache.create({"key": key, "value": value})
+
+        cache.search([], offset=QUICKBOARD_AI_CACHE_SIZE).unlink()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from odoo import Command, api, fields, models
+
+from ..wizard.quickboard_layout import QuickboardLayout
+
+_logger = logging.getLogger(__name__)
+
+# a step interrupted this many times (worker killed or restarted while running it) fails the job
+QUICKBOARD_AI_JOB_MAX_ATTEMPTS = 2
+# models generated per cron run when generating one conversation per model, each run must fit
+# in the cron time limit (limit_time_real_cron), the conversations of a run are parallel
+QUICKBOARD_AI_JOB_MODELS_PER_RUN = 4
+
+class QuickboardAiJob(models.Model):
+    """Generation of the items of a user with ai, run by a cron.
+
+    With one conversation per model the job is run in steps, a few models per cron run,
+    committed after each step so a long generation is never killed by the cron time
+    limit. A single conversation for all the models can not be split: it has to fit in
+    limit_time_real_cron, raise it for slow llms.
+    """
+    _name = "quickboard.ai.job"
+    _description = "Quickboard AI Generation Job"
+    _order = "id desc"
+
+    state = fields.Selection(
+        selection=[("queued", "Queued"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")],
+        string="State",
+        default="queued",
+        required=True)
+    progress = fields.Integer(string="Progress", default=0)
+    progress_message = fields.Char(string="Progress Message")
+
+    model_ids = fields.Many2many("ir.model", string="Models")
+    ai_per_model = fields.Boolean("One Conversation per Model", default=False)
+    screen_width = fields.Integer(string="Screen Width")
+    screen_height = fields.Integer(string="Screen Height")
+    cell_width = fields.Float(string="Cell Width")
+    cell_height = fields.Float(string="Cell Height")
+
+    generated_model_ids = fields.Many2many(
+        "ir.model", "quickboard_ai_job_generated_model_rel", string="Generated Models")
+    generated_items = fields.Text(string="Generated Items", help="JSON items generated by the previous steps")
+
+    result = fields.Text(string="Result")
+    error = fields.Text(string="Error")
+    attempts = fields.Integer(string="Attempts", default=0)
+
+    def _enqueue(self):
+        # generations are long and heavy for a local llm, the cron runs them one at a time
+        cron = self.env.ref("quickboard.ir_cron_quickboard_run_ai_jobs", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _reset_interrupted_jobs(self):
+        """Jobs are only run by the cron, which never runs twice at the same time: the jobs still
+        running when it starts were interrupted with their worker. They resume at their
+        interrupted step, the previous steps are kept."""
+        for job in self.sudo().search([("state", "=", "running")]):
+            if job.attempts >= QUICKBOARD_AI_JOB_MAX_ATTEMPTS:
+                job.write({"state": "failed", "error": "The generation was interrupted."})
+            else:
+                job.write({"state": "queued"})
+
+    @api.model
+    def _claim_job(self):
+        self.env.cr.execute("""
+            SELECT id FROM quickboard_ai_job
+            WHERE state = 'queued'
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.sudo().browse(row[0] if row else [])
+
+    @api.model
+    def _cron_run_jobs(self):
+        self._reset_interrupted_jobs()
+        self.env.cr.commit()
+
+        job = self._claim_job()
+        if not job:
+            return
+        job.attempts += 1
+
+        user = job.create_uid
+        job.with_user(user).with_context(lang=user.lang, tz=user.tz)._run()
+
+        # one step per run to release the cron worker, continue with the next ones
+        if self.sudo().search_count([("state", "=", "queued")], limit=1):
+            self.env.ref("quickboard.ir_cron_quickboard_run_ai_jobs")._trigger()
+
+    def _set_progress(self, progress, message, **vals):
+        self.ensure_one()
+        self.write(dict(vals, progress=progress, progress_message=message))
+        self.env["bus.bus"]._sendone(
+            self.create_uid.partner_id,
+            "quickboard_ai_job",
+            {
+                "id": self.id,
+                "state": self.state,
+                "progress": self.progress,
+                "message": self.progress_message,
+            }
+        )
+        # commit so the progress is visible while the llm is working
+        self.env.cr.commit()
+
+    def _get_step_progress(self):
+        self.ensure_one()
+        return 10 + 80 * len(self.generated_model_ids) // max(len(self.model_ids), 1)
+
+    def _run(self):
+        """Run the next step of the job, each step is committed."""
+        self.ensure_one()
+        try:
+            # autogen is only required when generating with ai
+            from ..wizard.ai import QuickboardAiGenerator
+
+            generator = QuickboardAiGenerator(self.env)
+            items = json.loads(self.generated_items or "[]")
+            if self.ai_per_model:
+                models = (self.model_ids - self.generated_model_ids)[:QUICKBOARD_AI_JOB_MODELS_PER_RUN]
+                if models:
+                    self._set_progress(
+                        self._get_step_progress(),
+                        "Generating items for %s" % ", ".join(models.mapped("name")),
+                        state="running")
+                    items += generator._generate_items_per_model(models) or []
+                    # a step done, the next one starts with its own attempts
+                    self._set_progress(
+                        self._get_step_progress(),
+                        "Generating items",
+                        state="queued",
+                        attempts=0,
+                        generated_model_ids=[Command.link(o.id) for o in models],
+                        generated_items=json.dumps(items))
+                    return
+            else:
+                self._set_progress(10, "Generating items", state="running")
+                items = generator._generate_items(self.model_ids) or []
+
+            if not items:
+                raise ValueError("The AI did not answer with valid dashboard items.")
+
+            self._set_progress(90, "Creating items", state="running")
+            arranged = QuickboardLayout(
+                self.screen_width,
+                self.screen_height,
+                self.cell_width,
+                self.cell_height
+            ).arrange(items)
+            self.env["quickboard.generator"]._create_quickboard_items(arranged, keep_layout=True)
+            self.env["quickboard.generator"]._send_quickboard_updated()
+        except Exception as e:
+            _logger.exception("Error generating quickboard with ai: %s", e)
+            self.env.cr.rollback()
+            self._set_progress(100, "Failed", state="failed", error=str(e))
+            return
+
+        self._set_progress(100, "Done", state="done", result=json.dumps(arranged), generated_items=False)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+
+from odoo import api, fields, models
+
+QUICKBOARD_CACHE_TTL = 300
+QUICKBOARD_CACHE_SIZE = 1024
+
+class QuickboardCache:
+    """In-process LRU cache with TTL for the computed data of quickboard items.
+
+    Entries are stored per model so that a create, write or unlink on a model drops
+    every entry computed from it. The cache lives in the worker process, the entries
+    of the data of the items are also keyed on the generation of their model (see
+    quickboard.cache.generation) so the changes made by the other workers are seen.
+    """
+    def __init__(self, ttl=QUICKBOARD_CACHE_TTL, max_size=QUICKBOARD_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._keys_by_model = {}
+        self._lock = threading.RLock()
+
+    @property
+    def models(self):
+        return self._keys_by_model.keys()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            model_name, expire_at, value = entry
+            if expire_at < time.monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, model_name, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (model_name, time.monotonic() + self.ttl, value)
+            self._keys_by_model.setdefault(model_name, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, model_name=None):
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                self._keys_by_model.clear()
+                return
+
+            for key in self._keys_by_model.pop(model_name, ()):
+                self._entries.pop(key, None)
+
+    def _remove(self, key):
+        model_name, _expire_at, _value = self._entries.pop(key)
+        keys = self._keys_by_model.get(model_name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_model[model_name]
+
+quickboard_cache = QuickboardCache()
+
+class QuickboardCacheGeneration(models.Model):
+    """Generation of the models used by quickboard items, bumped after each committed change.
+
+    It is part of the cache keys of the data of the items, so the entries cached by any
+    worker are not used anymore once another worker changed their model.
+    """
+    _name = "quickboard.cache.generation"
+    _description = "Quickboard Cache Generation"
+    _log_access = False
+
+    model_name = fields.Char(string="Model", required=True)
+    generation = fields.Integer(string="Generation", default=0, required=True)
+
+    _sql_constraints = [
+        ("model_name_uniq", "unique (model_name)", "A model has a single generation."),
+    ]
+
+    @api.model
+    def _get_generations(self, model_names):
+        """{model name: generation} of the given models, the missing ones are at 0"""
+        self.env.cr.execute(
+            "SELECT model_name, generation FROM quickboard_cache_generation WHERE model_name = ANY(%s)",
+            [list(model_names)]
+        )
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _bump(self, cr, model_names):
+        """Bump the generation of the models with the cursor `cr`, in its own transaction"""
+        # sorted so concurrent bumps lock the rows in the same order
+        cr.execute("""
+            INSERT INTO quickboard_cache_generation (model_name, generation)
+            SELECT unnest(%s::varchar[]), 1
+            ON CONFLICT (model_name) DO UPDATE SET generation = quickboard_cache_generation.generation + 1
+        """, [sorted(model_names)])
+
+class Base(models.AbstractModel):
+    _inherit = "base"
+
+    def _quickboard_invalidate_cache(self):
+        if self._name not in quickboard_cache.models and self._name not in self.env["quickboard.item"]._get_live_model_names():
+            return
+
+        quickboard_cache.invalidate(self._name)
+
+        # other transactions may have cached data read before our changes get committed,
+        # the generation is bumped in its own transaction so the writers never wait on it
+        model_names = self.env.cr.postcommit.data.setdefault("quickboard_cache.models", set())
+        if not model_names:
+            Generation = self.env["quickboard.cache.generation"]
+
+            @self.env.cr.postcommit.add
+            def _invalidate():
+                for model_name in model_names:
+                    quickboard_cache.invalidate(model_name)
+                with Generation.pool.cursor() as cr:
+                    Generation._bump(cr, model_names)
+        model_names.add(self._name)
+
+    def _quickboard_notify_change(self):
+        self._quickboard_invalidate_cache()
+        if self._name in self.env["quickboard.item"]._get_live_model_names():
+            self.env["quickboard.live.event"]._notify(self._name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._quickboard_notify_change()
+        return records
+
+    # stored computed fields are recomputed through _write, not write
+    def _write(self, vals):
+        res = super()._write(vals)
+        self._quickboard_notify_change()
+        return res
+
+    def _write_multi(self, vals_list):
+        res = super()._write_multi(vals_list)
+        self._quickboard_notify_change()
+        return res
+
+    def unlink(self):
+        self._quickboard_notify_change()
+        return super().unlink()
@@ -1,8 +1,35 @@
 # -*- coding: utf-8 -*-
+from ast import literal_eval
+from datetime import time
 from typing import Dict, List
 
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+
+from .quickboard_cache import quickboard_cache
+
+QUICKBOARD_GRID_COLUMNS = 12
+
+# dashboard definition keys sent for a changed field, when they differ from the field name
+QUICKBOARD_DEFINITION_KEYS = {
+    "model_id": ["model_name"],
+    "value_field_id": ["value_field_name", "value_field_type"],
+    "dimension_field_id": ["dimension_field_name", "dimension_field_type"],
+}
+
+# fields changing the computed figures of an item
+QUICKBOARD_DATA_FIELDS = {
+    "model_id",
+    "type",
+    "value_field_id",
+    "aggregate_function",
+    "dimension_field_id",
+    "datetime_granularity",
+    "list_row_limit",
+    "domain_filter",
+    "pre_aggregated",
+}
 
 class QuickboardItem(models.Model):
     _name = "quickboard.item"
@@ -42,6 +69,11 @@ class QuickboardItem(models.Model):
     text_color = fields.Char(string="Text Color", default="#000000")
     background_color = fields.Char(string="Background Color", default="#ffffff")
 
+    # pre-aggregation, charts and lists with a date/datetime dimension can be answered from a rollup
+    pre_aggregated = fields.Boolean(string="Pre-aggregated", default=False)
+    rollup_ids = fields.One2many("quickboard.item.rollup", "item_id", string="Rollups")
+    rollup_scope_ids = fields.One2many("quickboard.item.rollup.scope", "item_id", string="Rollup Scopes")
+
     # layout
     x_pos = fields.Integer(string="X Pos")
     y_pos = fields.Integer(string="Y Pos")
@@ -50,8 +82,8 @@ class QuickboardItem(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
-        for val in vals_list:
-            if not self.env.context.get("ai_generation", False):
+        if not self.env.context.get("ai_generation", False):
+            for val in vals_list:
                 if 'type' in val:
                     if val["type"] == "basic":
                         val["width"] = 2
@@ -59,21 +91,34 @@ class QuickboardItem(models.Model):
                     else:
                         val["width"] = 4
                         val["height"] = 2
-
-                sql = f"""WITH item_dim AS (
-                            SELECT y_pos, CASE WHEN height = 0 THEN 1 ELSE height END AS height
-                            FROM quickboard_item sdi WHERE create_uid = {self.env.uid}
-                        )
-                        SELECT max(y_pos + height) as max_y_pos FROM item_dim WHERE y_pos = (SELECT max(y_pos) FROM item_dim);
-                    """
-                self.env.cr.execute(sql)
-                res = self.env.cr.dictfetchall()
-                max_y_pos = res[0].get("max_y_pos")
-                val["y_pos"] = max_y_pos
-                val["x_pos"] = 0
+            self._place_new_items(vals_list)
 
         return super().create(vals_list)
 
+    def _place_new_items(self, vals_list):
+        """Place the new items below the existing ones of the user, packed in rows of the grid."""
+        self.env.cr.execute("""
+            SELECT max(y_pos + CASE WHEN coalesce(height, 0) = 0 THEN 1 ELSE height END) AS max_y_pos
+            FROM quickboard_item
+            WHERE create_uid = %s
+        """, [self.env.uid])
+        y_cursor = self.env.cr.fetchone()[0] or 0
+        x_cursor = 0
+        row_height = 0
+
+        for val in vals_list:
+            width = min(val.get("width") or 1, QUICKBOARD_GRID_COLUMNS)
+            height = val.get("height") or 1
+            if x_cursor + width > QUICKBOARD_GRID_COLUMNS:
+                y_cursor += row_height
+                x_cursor = 0
+                row_height = 0
+
+            val["x_pos"] = x_cursor
+            val["y_pos"] = y_cursor
+            x_cursor += width
+            row_height = max(row_height, height)
+
     @api.constrains("aggregate_function", "value_field_id")
     def _validate_aggregate_function(self):
         for rec in self:
@@ -98,14 +143,326 @@ class QuickboardItem(models.Model):
             if rec.dimension_field_id.ttype in ["date", "datetime"] and not rec.datetime_granularity:
                 raise ValidationError("Granularity for date or datetime field is required for charts.")
 
+    def _can_use_rollup(self):
+        self.ensure_one()
+        return self.pre_aggregated \
+            and self.type in ["chart", "list"] \
+            and self.dimension_field_id.ttype in ["date", "datetime"] \
+            and bool(self.datetime_granularity)
+
+    @api.model
+    def _is_rollup_range(self, start_date=None, end_date=None):
+        """Whether the range is made of whole days, the rollup rows are by day (UTC)."""
+        return all(
+            not value or fields.Datetime.from_string(value).time() == time.min
+            for value in (start_date, end_date)
+        )
+
+    def _get_rollup_signature(self):
+        """Definition parts the rollup depends on, a change requires a full rebuild."""
+        self.ensure_one()
+        return repr((
+            self.model_name,
+            self.value_field_id.name,
+            self.dimension_field_id.name,
+            self.datetime_granularity,
+            self.aggregate_function,
+            self.domain_filter or "",
+        ))
+
+    def _get_quickboard_access_domain(self):
+        """Record rules of the item model for the current user, evaluated.
+
+        The figures are read as superuser, this domain restricts them to the records
+        the user can read (own records, allowed companies...)."""
+        self.ensure_one()
+        return self.env['ir.rule']._compute_domain(self.model_name, 'read')
+
+    def _get_quickboard_values(self):
+        """Definition of the item as used by the dashboard."""
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'model_name': self.model_name,
+            'icon': self.icon,
+            'type': self.type,
+            'chart_type': self.chart_type,
+            'height': self.height,
+            'width': self.width,
+            'x_pos': self.x_pos,
+            'y_pos': self.y_pos,
+            'value_field_name': self.value_field_id.display_name,
+            'value_field_type': self.value_field_id.ttype,
+            'dimension_field_name': self.dimension_field_id.display_name,
+            'dimension_field_type': self.dimension_field_id.ttype,
+            'datetime_granularity': self.datetime_granularity,
+            'list_row_limit': self.list_row_limit,
+            'aggregate_function': self.aggregate_function,
+            'text_color': self.text_color,
+            'background_color': self.background_color
+        }
+
+    @api.model
+    @tools.ormcache('model_name', 'self.env.uid', 'self.env.lang')
+    def _get_model_field_infos(self, model_name):
+        """Stored fields of a model classified for quickboard items, shared by the generators.
+
+        Returns a dict with 'fields', a tuple of (name, type, normalized type, description, usage)
+        and the 'value_fields' and 'dimension_fields' names. The result is cached in the registry,
+        it must not be modified.
+        """
+        field_infos = []
+        value_fields = []
+        dimension_fields = []
+        for name, info in self.env[model_name].fields_get(attributes=["type", "string", "store"]).items():
+            if not info.get("store", True):
+                continue
+
+            ftype = info["type"]
+            if ftype in ["many2many", "one2many"]:
+                ftype_norm = "list"
+            elif ftype == "selection":
+                ftype_norm = "char"
+            elif ftype == "many2one":
+                ftype_norm = "integer"
+            else:
+                ftype_norm = ftype
+
+            usage = []
+            if ftype not in ["many2many", "one2many", "float", "monetary"]:
+                dimension_fields.append(name)
+                usage.append("dimension")
+            if ftype in ["integer", "float", "monetary", "many2one", "selection"]:
+                value_fields.append(name)
+                usage.append("value")
+
+            field_infos.append((name, ftype, ftype_norm, info.get("string"), tuple(usage)))
+
+        return {
+            "fields": tuple(field_infos),
+            "value_fields": tuple(value_fields),
+            "dimension_fields": tuple(dimension_fields),
+        }
+
+    def _read_quickboard_values(self):
+        """Same as _get_quickboard_values for the whole recordset with one read of the items
+        and one read of their fields."""
+        rows = self.read([
+            'name', 'model_name', 'icon', 'type', 'chart_type', 'height', 'width', 'x_pos', 'y_pos',
+            'value_field_id', 'dimension_field_id', 'datetime_granularity', 'list_row_limit',
+            'aggregate_function', 'text_color', 'background_color'
+        ], load=None)
+
+        field_ids = {o['value_field_id'] for o in rows} | {o['dimension_field_id'] for o in rows}
+        field_ids.discard(False)
+        field_infos = {
+            o['id']: o for o in self.env['ir.model.fields'].browse(field_ids).read(['display_name', 'ttype'])
+        }
+        no_field = {'display_name': False, 'ttype': False}
+
+        res = []
+        for row in rows:
+            value_field = field_infos.get(row.pop('value_field_id'), no_field)
+            dimension_field = field_infos.get(row.pop('dimension_field_id'), no_field)
+            row.update({
+                'value_field_name': value_field['display_name'],
+                'value_field_type': value_field['ttype'],
+                'dimension_field_name': dimension_field['display_name'],
+                'dimension_field_type': dimension_field['ttype'],
+            })
+            res.append(row)
+        return res
+
+    @api.model
+    def _get_quickboard_defs_etag(self):
+        """Tag of the definitions visible by the current user, changes with any item change."""
+        count, write_date = self._read_group([], aggregates=['__count', 'write_date:max'])[0]
+        return f"{self.env.uid}-{self.env.lang}-{count}-{write_date}"
+
+    def _get_quickboard_domain(self, start_date=None, end_date=None):
+        self.ensure_one()
+        domain = []
+        if start_date:
+            sd = fields.Datetime.from_string(start_date)
+            domain.append(("create_date", ">=", sd))
+
+        if end_date:
+            ed = fields.Datetime.from_string(end_date)
+            domain.append(("create_date", "<", ed))
+
+        if self.domain_filter and self.domain_filter != "":
+            filter = expression.AND([literal_eval(self.domain_filter)])
+            domain = expression.AND([domain, filter])
+
+        return expression.AND([domain, self._get_quickboard_access_domain()])
+
+    def _get_quickboard_group_by(self):
+        self.ensure_one()
+        group_by = self.dimension_field_id.name
+        if self.dimension_field_id.ttype in ["date", "datetime"]:
+            group_by = f"{group_by}:{self.datetime_granularity}"
+        return group_by
+
+    def _get_quickboard_cache_key(self, start_date=None, end_date=None, generation=0):
+        self.ensure_one()
+        # write_date covers any change of the item definition (fields, aggregate, type, limit...),
+        # the generation any change of the records of its model
+        return (
+            self.env.cr.dbname,
+            self.id,
+            generation,
+            self.write_date,
+            self.domain_filter,
+            start_date,
+            end_date,
+            self.datetime_granularity,
+            self.env.company.id,
+            tuple(self.env.companies.ids),
+            self.env.uid,
+        )
+
+    @api.model
+    def _get_quickboard_chart_data(self, aggs, index=0):
+        data = []
+        # seq is to ease t-foreach on the javascript part because it needs t-key
+        for seq, agg in enumerate(aggs, start=1):
+            if isinstance(agg[0], models.Model):
+                if agg[0]:
+                    x_data = agg[0].name
+                else:
+                    x_data = "N/A"
+            else:
+                x_data = agg[0]
+
+            data.append({
+                    "seq": seq,
+                    "x":  x_data,
+                    "y": agg[index + 1]
+                })
+        return data
+
+    def _get_quickboard_data(self, start_date=None, end_date=None):
+        """Compute the data of the items, returns a dict of item id -> data values.
+
+        Basic items sharing the same model and domain are computed with a single _read_group
+        using multiple aggregates, charts sharing the same model, domain and dimension as well.
+        List items are computed one by one since they have their own order and limit.
+        With the quickboard_skip_cache context key the cached data are not used, only refreshed.
+        """
+        res = {}
+        cache_keys = {}
+        basic_groups = {}
+        chart_groups = {}
+        generations = self.env["quickboard.cache.generation"]._get_generations(set(self.mapped("model_name")))
+
+        for quickboard_item in self:
+            cache_key = quickboard_item._get_quickboard_cache_key(
+                start_date, end_date, generations.get(quickboard_item.model_name, 0))
+            cached = None if self.env.context.get("quickboard_skip_cache") else quickboard_cache.get(cache_key)
+            if cached is not None:
+                res[quickboard_item.id] = dict(cached)
+                continue
+            cache_keys[quickboard_item.id] = (quickboard_item.model_name, cache_key)
+
+            if quickboard_item._can_use_rollup() and self._is_rollup_range(start_date, end_date):
+                # the rollup of the user's access scope, unless it is not built yet or built
+                # for a previous definition of the item, then the figures are computed live.
+                # Both count the records of [start_date, end_date), by whole days for the rollup
+                scope = self.env['quickboard.item.rollup.scope']._get_scope(quickboard_item)
+                if scope.rollup_date and scope.rollup_signature == quickboard_item._get_rollup_signature():
+                    aggs = self.env['quickboard.item.rollup'].sudo()._get_item_data(scope, start_date, end_date)
+                    res[quickboard_item.id] = {'data': self._get_quickboard_chart_data(aggs)}
+                    continue
+
+            domain = quickboard_item._get_quickboard_domain(start_date, end_date)
+            aggr_func = f"{quickboard_item.value_field_id.name}:{quickboard_item.aggregate_function}"
+
+            if quickboard_item.type == "basic":
+                key = (quickboard_item.model_name, repr(domain))
+                basic_groups.setdefault(key, (domain, []))[1].append((quickboard_item, aggr_func))
+            elif quickboard_item.type == "chart":
+                group_by = quickboard_item._get_quickboard_group_by()
+                key = (quickboard_item.model_name, repr(domain), group_by)
+                chart_groups.setdefault(key, (domain, []))[1].append((quickboard_item, aggr_func))
+            else:
+                group_by = quickboard_item._get_quickboard_group_by()
+                aggs = self.env[quickboard_item.model_name].sudo()._read_group(
+                    domain=domain,
+                    groupby=[group_by],
+                    aggregates=[aggr_func],
+                    limit=quickboard_item.list_row_limit,
+                    order=f"{aggr_func} desc"
+                )
+                res[quickboard_item.id] = {'data': self._get_quickboard_chart_data(aggs)}
+
+        for (model_name, _domain_key), (domain, group_items) in basic_groups.items():
+            aggregates = list(dict.fromkeys(aggr_func for _item, aggr_func in group_items))
+            agg = self.env[model_name].sudo()._read_group(
+                domain=domain,
+                groupby=[],
+                aggregates=aggregates
+            )
+            for quickboard_item, aggr_func in group_items:
+                aggregate_value = agg[0][aggregates.index(aggr_func)]
+                res[quickboard_item.id] = {'aggregate_value': aggregate_value if aggregate_value else 0}
+
+        for (model_name, _domain_key, group_by), (domain, group_items) in chart_groups.items():
+            aggregates = list(dict.fromkeys(aggr_func for _item, aggr_func in group_items))
+            aggs = self.env[model_name].sudo()._read_group(
+                domain=domain,
+                groupby=[group_by],
+                aggregates=aggregates
+            )
+            for quickboard_item, aggr_func in group_items:
+                data = self._get_quickboard_chart_data(aggs, aggregates.index(aggr_func))
+                res[quickboard_item.id] = {'data': data}
+
+        for item_id, (model_name, cache_key) in cache_keys.items():
+            quickboard_cache.set(model_name, cache_key, dict(res[item_id]))
+
+        return res
+
+    def _get_quickboard_delta(self, changed_fields, start_date=None, end_date=None):
+        """Bus payload for an item change: the changed definition values and, when the change
+        affects the figures, the fresh data for the given date range."""
+        self.ensure_one()
+        values = self._get_quickboard_values()
+        changed_keys = set()
+        for field_name in changed_fields:
+            changed_keys.update(QUICKBOARD_DEFINITION_KEYS.get(field_name, [field_name]))
+
+        delta = {
+            "id": self.id,
+            "values": {k: v for k, v in values.items() if k in changed_keys},
+        }
+        if QUICKBOARD_DATA_FIELDS.intersection(changed_fields):
+            delta["reload"] = True
+            if start_date and end_date:
+                delta.update({
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "data": self._get_quickboard_data(start_date, end_date)[self.id],
+                })
+        return delta
+
     def web_save(self, vals, specification: Dict[str, Dict], next_id=None) -> List[Dict]:
         res = super(QuickboardItem, self).web_save(vals, specification=specification, next_id=next_id)
+        if not res:
+            return res
+
+        # a new item is created by super, self is empty then
+        quickboard_item = self.browse(res[0]["id"])
+        # the dashboard passes its date range when opening the item form
+        delta = quickboard_item._get_quickboard_delta(
+            vals.keys(),
+            self.env.context.get("quickboard_start_date"),
+            self.env.context.get("quickboard_end_date"),
+        )
+        # items are private to their creator, only their sessions need the update
         self.env["bus.bus"]._sendone(
-                "quickboard",
+                quickboard_item.create_uid.partner_id,
                 "quickboard_item_updated",
-                {
-                    "id": self.id,
-                }
+                delta
             )
         return res
-
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+import logging
+from ast import literal_eval
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+from odoo.osv import expression
+
+_logger = logging.getLogger(__name__)
+
+# buckets touched by deleted records or by records moved to another bucket can't be found
+# from write_date, a full rebuild is done at this interval to get rid of them
+QUICKBOARD_ROLLUP_FULL_REFRESH = timedelta(days=1)
+# records are stamped with the start of their transaction, a transaction committed after a
+# refresh may have started before it: the changes are searched again over this overlap
+QUICKBOARD_ROLLUP_OVERLAP = timedelta(minutes=10)
+# scopes not viewed for this long are removed with their rollup
+QUICKBOARD_ROLLUP_SCOPE_RETENTION = timedelta(days=30)
+
+GRANULARITY_DELTA = {
+    "day": relativedelta(days=1),
+    "month": relativedelta(months=1),
+    "year": relativedelta(years=1),
+}
+
+class QuickboardItemRollupScope(models.Model):
+    """Rollup of an item for one access scope, the record rules of its viewers.
+
+    The rollup is computed as superuser, the evaluated record rule domain of the viewers
+    is added to the item domain so they only get the figures of the records they can read.
+    """
+    _name = "quickboard.item.rollup.scope"
+    _description = "Quickboard Item Rollup Scope"
+
+    item_id = fields.Many2one("quickboard.item", string="Item", required=True, ondelete="cascade", index=True)
+    access_domain = fields.Char(string="Access Domain", required=True)
+    rollup_date = fields.Datetime(string="Rollup Refresh Date", readonly=True)
+    rollup_full_date = fields.Datetime(string="Rollup Full Refresh Date", readonly=True)
+    rollup_signature = fields.Char(string="Rollup Signature", readonly=True)
+    last_used = fields.Datetime(string="Last Used", readonly=True, default=fields.Datetime.now)
+
+    _sql_constraints = [
+        ("item_access_domain_uniq", "unique(item_id, access_domain)", "A rollup scope must be unique per item."),
+    ]
+
+    @api.model
+    def _get_scope(self, item):
+        """Scope of the current user for the item, created when missing so the cron builds it."""
+        access_domain = repr(item._get_quickboard_access_domain())
+        scopes = self.sudo()
+        scope = scopes.search([("item_id", "=", item.id), ("access_domain", "=", access_domain)], limit=1)
+        if not scope:
+            scope = scopes.create({"item_id": item.id, "access_domain": access_domain})
+            cron = self.env.ref("quickboard.ir_cron_quickboard_refresh_rollups", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+        elif scope.last_used < fields.Datetime.now() - timedelta(days=1):
+            scope.last_used = fields.Datetime.now()
+        return scope
+
+    @api.autovacuum
+    def _gc_unused_scopes(self):
+        self.search([("last_used", "<", fields.Datetime.now() - QUICKBOARD_ROLLUP_SCOPE_RETENTION)]).unlink()
+
+class QuickboardItemRollup(models.Model):
+    """Pre-aggregated values of a quickboard item per dimension bucket and creation day.
+
+    The creation day is kept so the dashboard start/end date filter (on create_date)
+    can still be applied on the rollup.
+    """
+    _name = "quickboard.item.rollup"
+    _description = "Quickboard Item Rollup"
+
+    item_id = fields.Many2one("quickboard.item", string="Item", required=True, ondelete="cascade", index=True)
+    scope_id = fields.Many2one("quickboard.item.rollup.scope", string="Scope", required=True, ondelete="cascade", index=True)
+    bucket = fields.Date(string="Bucket")
+    create_day = fields.Date(string="Creation Day", index=True)
+    value_sum = fields.Float(string="Sum")
+    value_count = fields.Integer(string="Count")
+    value_min = fields.Float(string="Min")
+    value_max = fields.Float(string="Max")
+
+    def _get_aggregates(self, item):
+        value_field = item.value_field_id
+        if value_field.ttype in ["float", "integer", "monetary"]:
+            return [f"{value_field.name}:{func}" for func in ("sum", "count", "min", "max")]
+        return [f"{value_field.name}:count"]
+
+    def _get_base_domain(self, scope):
+        item = scope.item_id
+        domain = literal_eval(scope.access_domain)
+        if item.domain_filter and item.domain_filter != "":
+            domain = expression.AND([domain, literal_eval(item.domain_filter)])
+        return domain
+
+    def _get_model(self, item):
+        # buckets are computed in UTC so they match the domains built from them
+        return self.env[item.model_name].sudo().with_context(tz="UTC")
+
+    def _compute_rows(self, scope, domain):
+        item = scope.item_id
+        group_by = f"{item.dimension_field_id.name}:{item.datetime_granularity}"
+        aggregates = self._get_aggregates(item)
+        aggs = self._get_model(item)._read_group(
+            domain=domain,
+            groupby=[group_by, "create_date:day"],
+            aggregates=aggregates
+        )
+
+        vals_list = []
+        for bucket, create_day, *values in aggs:
+            vals = {
+                "item_id": item.id,
+                "scope_id": scope.id,
+                "bucket": fields.Date.to_date(bucket) if bucket else False,
+                "create_day": fields.Date.to_date(create_day) if create_day else False,
+            }
+            if len(values) == 4:
+                vals.update({
+                    "value_sum": values[0] or 0,
+                    "value_count": values[1] or 0,
+                    "value_min": values[2] or 0,
+                    "value_max": values[3] or 0,
+                })
+            else:
+                vals["value_count"] = values[0] or 0
+            vals_list.append(vals)
+
+        return vals_list
+
+    def _refresh_scope(self, scope, full=False):
+        item = scope.item_id
+        dimension = item.dimension_field_id.name
+        base_domain = self._get_base_domain(scope)
+        now = self.env.cr.now()
+
+        if full or not scope.rollup_date:
+            self.search([("scope_id", "=", scope.id)]).unlink()
+            self.create(self._compute_rows(scope, base_domain))
+            scope.write({"rollup_date": now, "rollup_full_date": now, "rollup_signature": item._get_rollup_signature()})
+            return
+
+        # find the buckets touched since the last refresh and recompute only them
+        changed_domain = expression.AND([
+            base_domain,
+            [("write_date", ">=", scope.rollup_date - QUICKBOARD_ROLLUP_OVERLAP)],
+        ])
+        group_by = f"{dimension}:{item.datetime_granularity}"
+        buckets = [o[0] for o in self._get_model(item)._read_group(changed_domain, groupby=[group_by])]
+
+        if buckets:
+            delta = GRANULARITY_DELTA[item.datetime_granularity]
+            # the bucket values are the start of the buckets, dates or datetimes like the dimension
+            bucket_domains = [
+                [(dimension, ">=", o), (dimension, "<", o + delta)] if o else [(dimension, "=", False)]
+                for o in buckets
+            ]
+            self.search([
+                ("scope_id", "=", scope.id),
+                ("bucket", "in", [fields.Date.to_date(o) if o else False for o in buckets]),
+            ]).unlink()
+            self.create(self._compute_rows(scope, expression.AND([base_domain, expression.OR(bucket_domains)])))
+
+        scope.write({"rollup_date": now})
+
+    @api.model
+    def _cron_refresh_rollups(self):
+        scopes = self.env["quickboard.item.rollup.scope"].sudo().search([("item_id.pre_aggregated", "=", True)])
+        for scope in scopes:
+            item = scope.item_id
+            if not item._can_use_rollup():
+                continue
+
+            full = scope.rollup_signature != item._get_rollup_signature() \
+                or not scope.rollup_full_date \
+                or scope.rollup_full_date + QUICKBOARD_ROLLUP_FULL_REFRESH < fields.Datetime.now()
+            try:
+                with self.env.cr.savepoint():
+                    self._refresh_scope(scope, full=full)
+            except Exception as e:
+                _logger.exception("Error refreshing quickboard rollup for item %s: %s", item.id, e)
+
+    def _get_item_data(self, scope, start_date=None, end_date=None):
+        """Answer a chart or list item from its rollup, returns the same data as the controller."""
+        item = scope.item_id
+        domain = [("scope_id", "=", scope.id)]
+        if start_date:
+            domain.append(("create_day", ">=", fields.Date.to_date(start_date)))
+        if end_date:
+            domain.append(("create_day", "<", fields.Date.to_date(end_date)))
+
+        partials = {}
+        for row in self.search_read(domain, ["bucket", "value_sum", "value_count", "value_min", "value_max"]):
+            partial = partials.setdefault(row["bucket"], {"sum": 0, "count": 0, "min": None, "max": None})
+            partial["sum"] += row["value_sum"]
+            partial["count"] += row["value_count"]
+            partial["min"] = row["value_min"] if partial["min"] is None else min(partial["min"], row["value_min"])
+            partial["max"] = row["value_max"] if partial["max"] is None else max(partial["max"], row["value_max"])
+
+        aggs = []
+        for bucket, partial in partials.items():
+            if item.aggregate_function == "avg":
+                value = partial["sum"] / partial["count"] if partial["count"] else 0
+            else:
+                value = partial[item.aggregate_function]
+            aggs.append((bucket, value))
+
+        if item.type == "list":
+            aggs.sort(key=lambda o: o[1], reverse=True)
+            aggs = aggs[:item.list_row_limit]
+        else:
+            aggs.sort(key=lambda o: (o[0] is False, o[0] or fields.Date.today()))
+
+        return aggs
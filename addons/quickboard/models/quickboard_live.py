@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from .quickboard_cache import quickboard_cache
+
+_logger = logging.getLogger(__name__)
+
+# seconds, changes made within this window after the first one are pushed together
+QUICKBOARD_LIVE_DEBOUNCE = 10
+
+class QuickboardLiveEvent(models.Model):
+    """Change of a model used by quickboard items, waiting to be pushed to the dashboards.
+
+    Events are only inserted by the transactions changing the records, so concurrent
+    transactions never wait on each other, the cron coalesces them per model.
+    """
+    _name = "quickboard.live.event"
+    _description = "Quickboard Live Event"
+    _log_access = False
+
+    model_name = fields.Char(string="Model", required=True)
+    create_date = fields.Datetime(string="Created on", default=fields.Datetime.now)
+
+    @api.model
+    def _notify(self, model_name):
+        model_names = self.env.cr.precommit.data.setdefault("quickboard.live.models", set())
+        if not model_names:
+            @self.env.cr.precommit.add
+            def _insert_events():
+                self.env.cr.executemany(
+                    "INSERT INTO quickboard_live_event (model_name, create_date) VALUES (%s, now() at time zone 'UTC')",
+                    [(o,) for o in model_names]
+                )
+                cron = self.env.ref("quickboard.ir_cron_quickboard_push_live_updates", raise_if_not_found=False)
+                if cron:
+                    cron.sudo()._trigger(fields.Datetime.now() + timedelta(seconds=QUICKBOARD_LIVE_DEBOUNCE))
+        model_names.add(model_name)
+
+    @api.model
+    def _cron_push_live_updates(self):
+        self.env.cr.execute("DELETE FROM quickboard_live_event RETURNING model_name")
+        model_names = {o[0] for o in self.env.cr.fetchall()}
+        if not model_names:
+            return
+
+        items = self.env["quickboard.item"].sudo().search([("model_id.model", "in", list(model_names))])
+        for owner, owner_items in items.grouped("create_uid").items():
+            if not owner:
+                continue
+            # the changes were made in other processes, the cache of this one may predate them
+            owner_items = owner_items.with_user(owner).with_context(tz=owner.tz, quickboard_skip_cache=True)
+            # figures are computed for the default dashboard range, others refetch the tile
+            today = fields.Date.context_today(owner_items)
+            start_date = fields.Date.to_string(today.replace(day=1))
+            end_date = fields.Date.to_string(today)
+            try:
+                items_data = owner_items._get_quickboard_data(start_date, end_date)
+            except Exception as e:
+                _logger.exception("Error computing live quickboard items for user %s: %s", owner.id, e)
+                continue
+
+            for quickboard_item in owner_items:
+                self.env["bus.bus"]._sendone(
+                    owner.partner_id,
+                    "quickboard_item_updated",
+                    {
+                        "id": quickboard_item.id,
+                        "values": {},
+                        "reload": True,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "data": items_data[quickboard_item.id],
+                    }
+                )
+
+class QuickboardItem(models.Model):
+    _inherit = "quickboard.item"
+
+    @api.model
+    def _get_live_model_names(self):
+        """Models used by the items. Called on every write of every model, so it is cached
+        in the worker; any change of the items drops it (see quickboard_cache), the other
+        workers see the new models within the cache TTL."""
+        cache_key = ("live_model_names", self.env.cr.dbname)
+        model_names = quickboard_cache.get(cache_key)
+        if model_names is None:
+            # plain sql, no need for the orm here
+            self.env.cr.execute("""
+                SELECT DISTINCT m.model
+                FROM quickboard_item i
+                JOIN ir_model m ON m.id = i.model_id
+            """)
+            model_names = frozenset(o[0] for o in self.env.cr.fetchall())
+            quickboard_cache.set("quickboard.item", cache_key, model_names)
+        return model_names
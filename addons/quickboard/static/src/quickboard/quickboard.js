@@ -13,6 +13,7 @@ class Quickboard extends Component {
     setup() {
         this.action = useService("action");
         this.dialog = useService("dialog");
+        this.notification = useService("notification");
 
         this.gridRef = useRef("grid-stack");
         this.state = useState({
@@ -29,14 +30,14 @@ class Quickboard extends Component {
         );
 
         useEffect(
-            (isReady) => {
+            (isReady, version) => {
                 self = this;
                 let items = Object.entries(this.quickboard.items)
                     .filter(([k, v]) => !isNaN(k))
                     .map(([k, v]) => Object.assign({}, v));
                 this.state.items = items;
             },
-            () => [this.quickboard.isReady]
+            () => [this.quickboard.isReady, this.quickboard.version]
         );
 
         onPatched(() => {
@@ -79,15 +80,26 @@ class Quickboard extends Component {
 
         this.busService = this.env.services.bus_service;
         this.busService.addChannel("quickboard");
-        this.busService.subscribe("quickboard_updated", ({}) => {
-            this.onMessage()
+        this.busService.subscribe("quickboard_updated", (payload) => {
+            this.onMessage(payload)
+        });
+        this.busService.subscribe("quickboard_item_updated", (payload) => {
+            this.onItemMessage(payload)
+        });
+        this.busService.subscribe("quickboard_ai_job", (payload) => {
+            this.onAiJobMessage(payload)
         });
 
         this.setupNoData();
     }
 
-    onMessage() {
-        this.applyFilter();
+    onMessage(payload) {
+        if (payload && payload.items) {
+            // pushed definitions come without etag, the next fetch will get a fresh one
+            this.quickboard.setQuickboardItemDefs(payload.items, "");
+        } else {
+            this.applyFilter();
+        }
         let grid = this.gridRef.current;
         if (grid && typeof grid.compact === "function") {
             try {
@@ -98,6 +110,23 @@ class Quickboard extends Component {
         }
     }
 
+    onItemMessage(payload) {
+        // the tile patches its own content, only the grid attributes and the item type are ours
+        this.quickboard.patchQuickboardItemDef(payload.id, payload.values);
+        const item = this.state.items.find((o) => o.id == payload.id);
+        if (item) {
+            Object.assign(item, payload.values);
+        }
+    }
+
+    onAiJobMessage(payload) {
+        if (payload.state === "done") {
+            this.notification.add(`Quickboard generated (job ${payload.id}).`, { type: "success" });
+        } else if (payload.state === "failed") {
+            this.notification.add(`Quickboard generation failed (job ${payload.id}), please check logs.`, { type: "danger" });
+        }
+    }
+
     onStartDateChanged(date) {
         this.state.startDate = date;
     }
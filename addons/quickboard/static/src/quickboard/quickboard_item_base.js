@@ -11,13 +11,31 @@ export class QuickboardItemBase extends Component {
         this.quickboard = useState(useService("quickboard"));
 
         this.busService = this.env.services.bus_service;
-        this.busService.subscribe("quickboard_item_updated", ({ id }) => {
-            this.onMessage(id)
+        this.busService.subscribe("quickboard_item_updated", (payload) => {
+            this.onMessage(payload)
         });
     }
 
-    onMessage(id) {
-        console.log(id);
+    onMessage(payload) {
+        if (payload.id != this.itemId) {
+            return;
+        }
+        // figures computed for another date range than ours can't be used, fetch ours
+        if (payload.reload && !(payload.data && this._isCurrentRange(payload))) {
+            return this.reloadData();
+        }
+        this.applyData(Object.assign({}, this.res, payload.values, payload.data || {}));
+    }
+
+    _isCurrentRange(payload) {
+        return payload.start_date === this.state.startDate.toSQLDate()
+            && payload.end_date === this.state.endDate.toSQLDate();
+    }
+
+    async reloadData() {}
+
+    applyData(res) {
+        this.res = res;
     }
 
     showItemConfig(ev) {
@@ -61,7 +79,9 @@ export class QuickboardItemBase extends Component {
             'target': 'new',
             'context': {
                 'dialog_size': 'medium',
-                'quick_edit': true
+                'quick_edit': true,
+                'quickboard_start_date': self.state.startDate.toSQLDate(),
+                'quickboard_end_date': self.state.endDate.toSQLDate()
             }
         });
     }
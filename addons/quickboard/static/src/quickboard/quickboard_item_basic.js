@@ -39,28 +39,31 @@ export class QuickboardItemBasic extends QuickboardItemBase {
         })
     }
 
-    async onMessage(id) {
-        if (id == this.itemId){
-            var target = this.gsItemRef.el;
+    async reloadData() {
+        var target = this.gsItemRef.el;
+        if (this.containerRef.el){
+            this.containerRef.el.classList.add("d-none");
+        }
+        this.spinner.spin(target);
+        await this.loadData(
+            this.props.itemId,
+            this.state.startDate,
+            this.state.endDate
+        ).then(() => {
             if (this.containerRef.el){
-                this.containerRef.el.classList.add("d-none");
+                this.containerRef.el.classList.remove("d-none");
             }
-            this.spinner.spin(target);
-            await this.loadData(
-                this.props.itemId,
-                this.state.startDate,
-                this.state.endDate
-            ).then(() => {
-                if (this.containerRef.el){
-                    this.containerRef.el.classList.remove("d-none");
-                }
-                this.spinner.stop()
-            });
-        }
+            this.spinner.stop()
+        });
     }
 
     async loadData(itemId, startDate, endDate) {
         const res = await this.quickboard.getQuickboardItem(itemId, startDate, endDate)
+        this.applyData(res);
+    }
+
+    applyData(res) {
+        super.applyData(res);
         this.state.title = res.name;
         this.state.icon = res.icon;
         this.state.valueFieldType = res.value_field_type;
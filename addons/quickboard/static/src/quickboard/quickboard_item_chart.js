@@ -44,21 +44,19 @@ export class QuickboardItemChart extends QuickboardItemBase {
         });
     }
 
-    async onMessage(id) {
-        if (id == this.itemId) {
-            var target = this.gsItemRef.el;
-            this.spinner.spin(target);
-            if (this.chartCanvasRef.el) {
-                this.chartCanvasRef.el.style.display = "none";
-            }
-            await this.loadData(
-                this.props.itemId,
-                this.state.startDate,
-                this.state.endDate
-            ).then(() => {
-                this.spinner.stop();
-            });
+    async reloadData() {
+        var target = this.gsItemRef.el;
+        this.spinner.spin(target);
+        if (this.chartCanvasRef.el) {
+            this.chartCanvasRef.el.style.display = "none";
         }
+        await this.loadData(
+            this.props.itemId,
+            this.state.startDate,
+            this.state.endDate
+        ).then(() => {
+            this.spinner.stop();
+        });
     }
 
     async loadData(itemId, startDate, endDate) {
@@ -70,6 +68,11 @@ export class QuickboardItemChart extends QuickboardItemBase {
             startDate,
             endDate
         );
+        this.applyData(res);
+    }
+
+    applyData(res) {
+        super.applyData(res);
         this.state.title = res.name;
         this.state.icon = res.icon;
         this.state.chartType = res.chart_type;
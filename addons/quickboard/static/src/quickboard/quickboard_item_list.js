@@ -44,24 +44,22 @@ export class QuickboardItemList extends QuickboardItemBase {
         });
     }
 
-    async onMessage(id) {
-        if (id == this.itemId) {
-            var target = this.gsItemRef.el;
+    async reloadData() {
+        var target = this.gsItemRef.el;
+        if (this.containerRef.el){
+            this.containerRef.el.classList.add("d-none");
+        }
+        this.spinner.spin(target);
+        await this.loadData(
+            this.props.itemId,
+            this.state.startDate,
+            this.state.endDate
+        ).then(() => {
             if (this.containerRef.el){
-                this.containerRef.el.classList.add("d-none");
+                this.containerRef.el.classList.remove("d-none");
             }
-            this.spinner.spin(target);
-            await this.loadData(
-                this.props.itemId,
-                this.state.startDate,
-                this.state.endDate
-            ).then(() => {
-                if (this.containerRef.el){
-                    this.containerRef.el.classList.remove("d-none");
-                }
-                this.spinner.stop();
-            });
-        }
+            this.spinner.stop();
+        });
     }
 
     async loadData(itemId, startDate, endDate) {
@@ -73,6 +71,11 @@ export class QuickboardItemList extends QuickboardItemBase {
             startDate,
             endDate
         );
+        this.applyData(res);
+    }
+
+    applyData(res) {
+        super.applyData(res);
         this.state.title = res.name;
         this.state.icon = res.icon;
         this.state.data = res.data;
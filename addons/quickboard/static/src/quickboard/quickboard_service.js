@@ -2,15 +2,21 @@
 
 import { registry } from "@web/core/registry";
 import { reactive } from "@odoo/owl";
+import { session } from "@web/session";
 
 const quickboardService = {
+    dependencies: ["bus_service"],
     start(env, services) {
         // prefer injected services, fall back to env.services if not present
         const rpc = (services && services.rpc) || (env.services && env.services.rpc);
         const ui = (services && services.ui) || (env.services && env.services.ui);
+        const bus = (services && services.bus_service) || (env.services && env.services.bus_service);
         const quickboard = reactive({
             items: {},
-            isReady: false
+            isReady: false,
+            version: 0,
+            // tiles data pushed through the bus by background workers instead of one rpc
+            streaming: Boolean(session.quickboard_streaming) && Boolean(bus),
         });
 
         // Helper to support multiple rpc service shapes (function or object with query/call)
@@ -59,22 +65,139 @@ const quickboardService = {
             }
         }
 
+        // definitions rarely change, the server only sends them again when its etag differs
+        let itemDefsEtag = "";
+        let itemDefs = [];
+
         async function getQuickboardItemDefs() {
             quickboard.isReady = false;
             quickboard.items = {};
-            const updates = await callRpc("/quickboard/item_defs", {});
+            const res = await callRpc("/quickboard/item_defs", { etag: itemDefsEtag });
+            if (!res.not_modified) {
+                itemDefsEtag = res.etag;
+                itemDefs = res.items;
+            }
+            setQuickboardItemDefs(itemDefs);
+        };
+
+        function setQuickboardItemDefs(updates, etag) {
+            if (etag !== undefined) {
+                itemDefsEtag = etag;
+                itemDefs = updates;
+            }
+            quickboard.items = {};
             Object.assign(quickboard.items, updates);
+            // isReady may already be true when definitions are pushed, this lets the board notice
+            quickboard.version++;
             quickboard.isReady = true;
         };
 
-        async function getQuickboardItem(itemId, startDate, endDate) {
-            return await callRpc("/quickboard/item", {
-                item_id: itemId,
+        function patchQuickboardItemDef(itemId, values) {
+            const item = Object.values(quickboard.items).find((o) => o.id == itemId);
+            if (item) {
+                Object.assign(item, values);
+            }
+        };
+
+        // Tiles request their data one by one when they are mounted, requests issued in the same
+        // tick for the same date range are batched into a single /quickboard/items_data call.
+        const pendingBatches = {};
+
+        async function getQuickboardItemsData(itemIds, startDate, endDate) {
+            return await callRpc("/quickboard/items_data", {
+                item_ids: itemIds,
                 start_date: startDate.toSQLDate(),
                 end_date: endDate.toSQLDate(),
             });
         };
 
+        // request id -> callbacks of the tiles waiting for their streamed data
+        const streamedBatches = {};
+
+        if (bus) {
+            bus.subscribe("quickboard_item_data", (payload) => {
+                const callbacks = streamedBatches[payload.request_id];
+                if (!callbacks) {
+                    return;
+                }
+                if (payload.error) {
+                    console.warn(`Quickboard item ${payload.id} failed: ${payload.error}`);
+                }
+                streamedBatches[payload.request_id] = callbacks.filter((cb) => {
+                    if (cb.itemId == payload.id) {
+                        cb.resolve(payload);
+                        return false;
+                    }
+                    return true;
+                });
+                if (streamedBatches[payload.request_id].length === 0) {
+                    delete streamedBatches[payload.request_id];
+                }
+            });
+        }
+
+        async function streamBatch(batch) {
+            const requestId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+            const itemIds = [...new Set(batch.callbacks.map((o) => o.itemId))];
+            // registered before the call, bus messages might come in before the rpc returns
+            streamedBatches[requestId] = batch.callbacks;
+            try {
+                const streamedIds = await callRpc("/quickboard/items_stream", {
+                    request_id: requestId,
+                    item_ids: itemIds,
+                    start_date: batch.startDate.toSQLDate(),
+                    end_date: batch.endDate.toSQLDate(),
+                });
+                // items not accessible anymore will never be pushed
+                for (const cb of batch.callbacks) {
+                    if (!streamedIds.includes(cb.itemId)) {
+                        cb.resolve(undefined);
+                    }
+                }
+                streamedBatches[requestId] = (streamedBatches[requestId] || []).filter((cb) => streamedIds.includes(cb.itemId));
+                if (streamedBatches[requestId].length === 0) {
+                    delete streamedBatches[requestId];
+                }
+            } catch (err) {
+                delete streamedBatches[requestId];
+                for (const cb of batch.callbacks) {
+                    cb.reject(err);
+                }
+            }
+        };
+
+        async function flushBatch(key) {
+            const batch = pendingBatches[key];
+            delete pendingBatches[key];
+            if (quickboard.streaming) {
+                return await streamBatch(batch);
+            }
+            try {
+                const itemIds = [...new Set(batch.callbacks.map((o) => o.itemId))];
+                const res = await getQuickboardItemsData(itemIds, batch.startDate, batch.endDate);
+                const byId = Object.fromEntries(res.map((o) => [o.id, o]));
+                for (const cb of batch.callbacks) {
+                    cb.resolve(byId[cb.itemId]);
+                }
+            } catch (err) {
+                for (const cb of batch.callbacks) {
+                    cb.reject(err);
+                }
+            }
+        };
+
+        function getQuickboardItem(itemId, startDate, endDate) {
+            const key = `${startDate.toSQLDate()}|${endDate.toSQLDate()}`;
+            let batch = pendingBatches[key];
+            if (!batch) {
+                batch = pendingBatches[key] = { startDate, endDate, callbacks: [] };
+                setTimeout(() => flushBatch(key), 0);
+            }
+            return new Promise((resolve, reject) => {
+                batch.callbacks.push({ itemId, resolve, reject });
+            });
+        };
+
         async function saveLayout(layout){
             await callRpc("/quickboard/save_layout", {
                 layout: layout
@@ -82,7 +205,10 @@ const quickboardService = {
         };
 
         quickboard.getQuickboardItemDefs = getQuickboardItemDefs;
+        quickboard.setQuickboardItemDefs = setQuickboardItemDefs;
+        quickboard.patchQuickboardItemDef = patchQuickboardItemDef;
         quickboard.getQuickboardItem = getQuickboardItem;
+        quickboard.getQuickboardItemsData = getQuickboardItemsData;
         quickboard.saveLayout = saveLayout;
         return quickboard;
     }
@@ -1,30 +1,43 @@
 # -*- coding: utf-8 -*-
 from autogen import AssistantAgent, UserProxyAgent, filter_config
 from textwrap import dedent
-from prettytable import PrettyTable
-
-# API_KEY = "_ollama_"
-# BASE_URL = "http://localhost:11434/v1"
-
-API_KEY = "_lmstudio_"
-BASE_URL = "http://localhost:1234/v1"
 
 LLM_MODEL = "qwen2.5-coder-7b-instruct"
 
-DEFAULT_AUTOGEN_CONFIG_LIST = [
+# local openai compatible servers, can be overridden with the json list of the
+# 'quickboard.llm_backends' system parameter
+QUICKBOARD_LLM_BACKENDS = [
     {
+        "name": "lmstudio",
+        "base_url": "http://localhost:1234/v1",
+        "api_key": "_lmstudio_",
         "model": LLM_MODEL,
-        "base_url": BASE_URL,
-        "api_key": API_KEY,
     },
+    # {
+    #     "name": "ollama",
+    #     "base_url": "http://localhost:11434/v1",
+    #     "api_key": "_ollama_",
+    #     "model": LLM_MODEL,
+    # },
+    # stub answering without llm, see llm_stub_server.py
+    # {
+    #     "name": "stub",
+    #     "base_url": "http://localhost:8765/v1",
+    #     "api_key": "_stub_",
+    #     "model": "stub",
+    # },
 ]
 
-DEFAULT_AUTOGEN_LLM_CONFIG = {
-    "config_list": DEFAULT_AUTOGEN_CONFIG_LIST,
-    "cache_seed": None,
-    "temperature": 0.3,
-    "seed": 10
-}
+# seconds, for a whole answer and for opening a connection
+QUICKBOARD_LLM_TIMEOUT = 300
+QUICKBOARD_LLM_CONNECT_TIMEOUT = 5
+# connections kept open per backend
+QUICKBOARD_LLM_KEEPALIVE = 8
+# seconds a failing backend is skipped, multiplied by its consecutive failures
+QUICKBOARD_LLM_COOLDOWN = 30
+
+QUICKBOARD_LLM_TEMPERATURE = 0.3
+QUICKBOARD_LLM_SEED = 10
 
 QUICKBOARD_COLORS = [
     "#845ec2",
@@ -47,6 +60,9 @@ QUICKBOARD_COLORS = [
     "#ff8066",
 ]
 
+# colors are css hex colors, e.g. #fff or #845ec2
+QUICKBOARD_COLOR_PATTERN = "#[0-9a-fA-F]{6}|#[0-9a-fA-F]{3}"
+
 QUICKBOARD_DATA_UI_JSON_SCHEMA = {
     "$schema": "http://json-schema.org/draft-07/schema#",
     "title": "Generated schema for Root",
@@ -161,10 +177,14 @@ QUICKBOARD_DATA_ONLY_JSON_SCHEMA = {
                 "enum": ["avg", "count", "max", "min", "sum"]
             },
             "text_color": {
-                "type": "string"
+                "type": "string",
+                "pattern": QUICKBOARD_COLOR_PATTERN,
+                "default": "#000000"
             },
             "background_color": {
-                "type": "string"
+                "type": "string",
+                "pattern": QUICKBOARD_COLOR_PATTERN,
+                "default": "#ffffff"
             },
             "dimension_field": {
                 "type": "string"
@@ -218,41 +238,3 @@ QUICKBOARD_DATA_ONLY_JSON_SCHEMA = {
         ]
     }
 }
-
-QUICKBOARD_LAYOUT_JSON_SCHEMA = {
-    "$schema": "http://json-schema.org/draft-07/schema#",
-    "title": "Generated schema for Root",
-    "type": "array",
-    "items": {
-        "type": "object",
-        "properties": {
-            "id": {
-                "type": "integer"
-            },
-            "type": {
-                "enum": ["basic", "chart", "list"]
-            },
-            "x_pos": {
-                "type": "integer"
-            },
-            "y_pos": {
-                "type": "integer"
-            },
-            "width": {
-                "type": "integer"
-            },
-            "height": {
-                "type": "integer"
-            }
-        },
-        "required": [
-            "id",
-            "type",
-            "x_pos",
-            "y_pos",
-            "width",
-            "height"
-        ]
-    }
-}
-
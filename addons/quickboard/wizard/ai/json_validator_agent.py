@@ -1,33 +1,192 @@
 # -*- coding: utf-8 -*-
 import json
+import logging
+import re
 
+from difflib import SequenceMatcher, get_close_matches
 from textwrap import dedent
-from typing import Any, Callable, Dict, List, Optional, Literal, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Literal, Union
 
-def minimal_validate(data, schema):
+from autogen import Agent, ConversableAgent
+from autogen.coding import CodeExecutor, CodeExtractor, MarkdownCodeExtractor, CodeBlock, CodeResult
+from autogen.runtime_logging import log_new_agent, logging_enabled
+
+_logger = logging.getLogger(__name__)
+
+# close spellings of an enum value scoring within this ratio of the best one are ambiguous
+JSON_ENUM_AMBIGUITY_RATIO = 0.1
+
+JSON_SCHEMA_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+class JsonSchemaRepairer:
     """
-    Lightweight schema validator: checks the AI output is a list of objects
-    and that each item contains the basic required keys.
+    Validator for the json lists answered by the llm, compiled once from the subset of
+    json schema used by the generators (required, type, enum, const, pattern, default,
+    minItems, maxItems and allOf of if/then on item properties).
     This avoids the external 'jsonschema' dependency.
+
+    Trivial errors are repaired in place instead of being sent back to the llm:
+    a value outside of an enum is replaced by the allowed one it unambiguously stands
+    for (or the only one), a value not matching its pattern or a missing value falls back
+    on the schema default and integers given as strings are converted.
     """
-    if not isinstance(data, list):
-        raise Exception("JSON must be a list")
-    required = ['name', 'icon', 'type', 'model', 'value_field', 'aggregate_function']
-    for idx, item in enumerate(data):
-        if not isinstance(item, dict):
-            raise Exception(f"Item {idx} is not an object")
-        for k in required:
-            if k not in item:
-                raise Exception(f"Missing required key '{k}' in item {idx}")
-    return True
+    def __init__(self, schema):
+        items = schema.get("items", {})
+        self.min_items = schema.get("minItems")
+        self.max_items = schema.get("maxItems")
+        self.required = tuple(items.get("required", ()))
+        self.properties = {
+            name: self._compile_property(prop)
+            for name, prop in items.get("properties", {}).items()
+        }
 
-from autogen import Agent, ConversableAgent
-from autogen.coding import CodeExecutor, CodeExtractor, MarkdownCodeExtractor, CodeBlock, CodeResult
-from autogen.runtime_logging import log_new_agent, logging_enabled
+        self.conditionals = []
+        for rule in items.get("allOf", []):
+            conditions = {
+                name: self._compile_property(prop)["enum"]
+                for name, prop in rule.get("if", {}).get("properties", {}).items()
+            }
+            then = rule.get("then", {})
+            self.conditionals.append((
+                conditions,
+                tuple(then.get("required", ())),
+                {name: self._compile_property(prop) for name, prop in then.get("properties", {}).items()},
+            ))
+
+    def _compile_property(self, prop):
+        enum = prop.get("enum")
+        if "const" in prop:
+            enum = [prop["const"]]
+        return {
+            "type": JSON_SCHEMA_TYPES.get(prop.get("type")),
+            "enum": tuple(enum) if enum is not None else None,
+            "pattern": re.compile(prop["pattern"]) if "pattern" in prop else None,
+            "default": prop.get("default"),
+        }
+
+    def _get_enum_candidates(self, value, enum):
+        """Allowed values `value` may stand for, by decreasing confidence: same value but
+        for the case, values it is a prefix of, values containing it, then close spellings.
+        Returns the candidates of the first kind found, a single one is a safe repair."""
+        value = str(value).lower()
+        names = {str(o).lower(): o for o in enum}
+        for matches in (
+            lambda: [name for name in names if name == value],
+            lambda: [name for name in names if name.startswith(value)],
+            lambda: [name for name in names if value in name],
+            lambda: self._get_close_spellings(value, list(names)),
+        ):
+            candidates = matches()
+            if candidates:
+                return [names[name] for name in candidates]
+        return []
+
+    def _get_close_spellings(self, value, names):
+        matches = get_close_matches(value, names, n=len(names), cutoff=0.6)
+        if not matches:
+            return []
+        best = SequenceMatcher(None, value, matches[0]).ratio()
+        return [o for o in matches if SequenceMatcher(None, value, o).ratio() >= best - JSON_ENUM_AMBIGUITY_RATIO]
+
+    def _matches(self, item, conditions):
+        return all(name in item and item[name] in enum for name, enum in conditions.items())
+
+    def _check_value(self, item, idx, name, prop, errors, repairs):
+        value = item[name]
+
+        expected_type = prop["type"]
+        if expected_type and (not isinstance(value, expected_type) or (expected_type is int and isinstance(value, bool))):
+            if expected_type is int and isinstance(value, str) and value.strip().lstrip("-").isdigit():
+                item[name] = int(value)
+            elif isinstance(value, list) and value and isinstance(value[0], expected_type):
+                item[name] = value[0]
+            elif prop["default"] is not None:
+                item[name] = prop["default"]
+            else:
+                errors.append(f"Item {idx}: '{name}' must be of type {expected_type.__name__ if isinstance(expected_type, type) else 'number'}.")
+                return
+            repairs.append(f"Item {idx}: '{name}' {value!r} replaced by {item[name]!r}.")
+            value = item[name]
+
+        pattern = prop["pattern"]
+        if pattern and isinstance(value, str) and not pattern.fullmatch(value):
+            if prop["default"] is None:
+                errors.append(f"Item {idx}: '{name}' {value!r} is not valid.")
+                return
+            item[name] = prop["default"]
+            repairs.append(f"Item {idx}: '{name}' {value!r} replaced by {item[name]!r}.")
+
+        enum = prop["enum"]
+        if enum is not None and value not in enum:
+            candidates = self._get_enum_candidates(value, enum)
+            if len(enum) == 1:
+                item[name] = enum[0]
+            elif len(candidates) == 1:
+                item[name] = candidates[0]
+            elif candidates:
+                # a guess could silently pick the wrong field, let the llm choose
+                errors.append(f"Item {idx}: '{name}' {value!r} is ambiguous, it must be one of {candidates}.")
+                return
+            else:
+                errors.append(f"Item {idx}: '{name}' {value!r} must be one of {list(enum)}.")
+                return
+            repairs.append(f"Item {idx}: '{name}' {value!r} replaced by {item[name]!r}.")
+
+    def _check_required(self, item, idx, required, errors, repairs):
+        for name in required:
+            if item.get(name) is not None:
+                continue
+            default = self.properties.get(name, {}).get("default")
+            if default is None:
+                errors.append(f"Missing required key '{name}' in item {idx}.")
+            else:
+                item[name] = default
+                repairs.append(f"Item {idx}: missing '{name}' set to {default!r}.")
+
+    def validate(self, data):
+        """Validate and repair data in place, returns (errors, repairs) as lists of messages."""
+        errors = []
+        repairs = []
+
+        if not isinstance(data, list):
+            return ["JSON must be a list."], repairs
+        if self.min_items is not None and len(data) < self.min_items:
+            errors.append(f"JSON must contain at least {self.min_items} items.")
+        if self.max_items is not None and len(data) > self.max_items:
+            errors.append(f"JSON must contain at most {self.max_items} items.")
+
+        for idx, item in enumerate(data):
+            if not isinstance(item, dict):
+                errors.append(f"Item {idx} is not an object.")
+                continue
+
+            self._check_required(item, idx, self.required, errors, repairs)
+            for name, prop in self.properties.items():
+                if item.get(name) is not None:
+                    self._check_value(item, idx, name, prop, errors, repairs)
+
+            # rules are applied in order, a rule can depend on a value repaired by a previous one
+            for conditions, required, properties in self.conditionals:
+                if not self._matches(item, conditions):
+                    continue
+                self._check_required(item, idx, required, errors, repairs)
+                for name, prop in properties.items():
+                    if item.get(name) is not None:
+                        self._check_value(item, idx, name, prop, errors, repairs)
+
+        return errors, repairs
 
 class JsonValidator(CodeExecutor):
     def __init__(self, json_schema, **kwargs):
         self.json_schema = json_schema
+        self.repairer = JsonSchemaRepairer(json_schema)
 
     @property
     def code_extractor(self) -> CodeExtractor:
@@ -48,12 +207,19 @@ class JsonValidator(CodeExecutor):
 
             try:
                 quickboard_json = json.loads(code)
-                # Use lightweight validator instead of jsonschema
-                minimal_validate(quickboard_json, self.json_schema)
             except Exception as e:
                 exitcode = -1
                 logs_all += f"\nError: {str(e)}"
                 break
+
+            # trivial errors are repaired on the extracted answer, only the others cost another llm round
+            errors, repairs = self.repairer.validate(quickboard_json)
+            if repairs:
+                _logger.info("Repaired json answer: %s", " ".join(repairs))
+            if errors:
+                exitcode = -1
+                logs_all += "\nError: " + "\n".join(errors)
+                break
             exitcode = 0
             logs_all += f"Json is valid."
             json_code_block_count += 1
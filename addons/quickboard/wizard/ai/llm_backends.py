@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import threading
+import time
+
+from types import SimpleNamespace
+
+import httpx
+from openai import OpenAI
+
+from .consts import (
+    QUICKBOARD_LLM_BACKENDS,
+    QUICKBOARD_LLM_CONNECT_TIMEOUT,
+    QUICKBOARD_LLM_COOLDOWN,
+    QUICKBOARD_LLM_KEEPALIVE,
+    QUICKBOARD_LLM_SEED,
+    QUICKBOARD_LLM_TEMPERATURE,
+    QUICKBOARD_LLM_TIMEOUT,
+)
+
+_logger = logging.getLogger(__name__)
+
+# the answer is complete once its json code block is closed, the rest is only comments
+JSON_CODE_BLOCK_RE = re.compile(r"```json\s.*?```", re.DOTALL)
+
+class LlmBackend:
+    """One local OpenAI compatible server, with its pooled keep-alive connections."""
+    def __init__(self, name, base_url, api_key, model, timeout=QUICKBOARD_LLM_TIMEOUT):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.in_flight = 0
+        self.failures = 0
+        self.unhealthy_until = 0
+
+        # clients are thread safe, one per backend for all the generations of the worker
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=QUICKBOARD_LLM_KEEPALIVE,
+                max_keepalive_connections=QUICKBOARD_LLM_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(timeout, connect=QUICKBOARD_LLM_CONNECT_TIMEOUT),
+        )
+        self.client = OpenAI(base_url=base_url, api_key=api_key, http_client=self.http_client, max_retries=0)
+
+    @property
+    def healthy(self):
+        return self.unhealthy_until <= time.monotonic()
+
+class LlmBackendPool:
+    """Routes the requests to the healthy backend with the fewest requests running.
+
+    A failing backend is skipped for a cooldown growing with its consecutive failures,
+    then gets requests again, its first success makes it healthy again.
+    """
+    def __init__(self, backends):
+        self.backends = [LlmBackend(**o) for o in backends]
+        self._lock = threading.Lock()
+
+    def _acquire(self, excluded):
+        with self._lock:
+            candidates = [o for o in self.backends if o not in excluded]
+            if not candidates:
+                return None
+            healthy = [o for o in candidates if o.healthy]
+            # when all are failing, try the one coming back first rather than giving up
+            backend = min(healthy, key=lambda o: o.in_flight) if healthy else min(candidates, key=lambda o: o.unhealthy_until)
+            backend.in_flight += 1
+            return backend
+
+    def _release(self, backend, error=None):
+        with self._lock:
+            backend.in_flight -= 1
+            if error is None:
+                backend.failures = 0
+                backend.unhealthy_until = 0
+            else:
+                backend.failures += 1
+                backend.unhealthy_until = time.monotonic() + QUICKBOARD_LLM_COOLDOWN * backend.failures
+
+    def _stream(self, backend, params):
+        """Read the answer as it is generated, stop once its json code block is closed."""
+        content = ""
+        finish_reason = None
+        stream = backend.client.chat.completions.create(model=backend.model, stream=True, **params)
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                content += choice.delta.content or ""
+                finish_reason = choice.finish_reason or finish_reason
+                if JSON_CODE_BLOCK_RE.search(content):
+                    finish_reason = "stop"
+                    break
+        finally:
+            # drops the rest of the generation, the connection goes back to the pool
+            stream.close()
+        return content, finish_reason
+
+    def complete(self, params):
+        tried = set()
+        last_error = None
+        while True:
+            backend = self._acquire(tried)
+            if backend is None:
+                raise last_error or RuntimeError("No llm backend configured.")
+            tried.add(backend)
+
+            try:
+                content, finish_reason = self._stream(backend, params)
+            except Exception as e:
+                _logger.warning("Llm backend %s failed: %s", backend.name, e)
+                self._release(backend, error=e)
+                last_error = e
+                continue
+
+            self._release(backend)
+            return backend, content, finish_reason
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_backend_pool(backends):
+    """Pools are shared by the generations with the same backends so connections are reused."""
+    key = tuple(sorted((o["name"], o["base_url"], o["model"]) for o in backends))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = LlmBackendPool(backends)
+        return pool
+
+def get_llm_config(backends=None):
+    """Autogen llm config answering through the backend pool."""
+    backends = backends or QUICKBOARD_LLM_BACKENDS
+    return {
+        "config_list": [{
+            "model": ",".join(o["model"] for o in backends),
+            "model_client_cls": "QuickboardLlmClient",
+            "backends": backends,
+        }],
+        "cache_seed": None,
+        "temperature": QUICKBOARD_LLM_TEMPERATURE,
+        "seed": QUICKBOARD_LLM_SEED,
+    }
+
+class QuickboardLlmClient:
+    """Autogen model client for the backend pool, see autogen ModelClient protocol.
+
+    Agents using it must register it with register_model_client."""
+    # parameters of autogen forwarded to the chat completion
+    _FORWARDED_PARAMS = ("messages", "temperature", "seed", "max_tokens", "stop", "top_p")
+
+    def __init__(self, config, **kwargs):
+        self.pool = get_backend_pool(config["backends"])
+
+    def create(self, params):
+        backend, content, finish_reason = self.pool.complete({
+            key: params[key] for key in self._FORWARDED_PARAMS if params.get(key) is not None
+        })
+        message = SimpleNamespace(content=content, role="assistant", function_call=None, tool_calls=None)
+        return SimpleNamespace(
+            model=backend.model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+            # streamed answers have no usage, it is estimated like the prompt
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(str(o.get("content") or "")) for o in params["messages"]) // 4,
+                completion_tokens=len(content) // 4,
+            ),
+        )
+
+    def message_retrieval(self, response):
+        return [choice.message.content for choice in response.choices]
+
+    def cost(self, response):
+        # local servers
+        return 0
+
+    @staticmethod
+    def get_usage(response):
+        return {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.prompt_tokens + response.usage.completion_tokens,
+            "cost": 0,
+            "model": response.model,
+        }
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Local OpenAI compatible server answering the quickboard generator without llm.
+
+It answers a count item and, when the model has numeric value fields, a sum item per
+model of the prompt, streamed like a real server. Used to run the AI generation in
+tests and development, add it to the 'quickboard.llm_backends' system parameter:
+
+    python3 llm_stub_server.py --port 8765
+    [{"name": "stub", "base_url": "http://localhost:8765/v1", "api_key": "_stub_", "model": "stub"}]
+
+It only depends on the standard library so it can run outside of odoo.
+"""
+import argparse
+import json
+import re
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_RE = re.compile(r"The model '([^']+)' has the following fields \(name\|type\|description\|usage\):\n((?:[^\n]+\n?)*)")
+
+def stub_answer(prompt):
+    items = []
+    for model_name, field_defs in MODEL_RE.findall(prompt):
+        fields = [o.split("|") for o in field_defs.strip().splitlines()]
+        items.append({
+            "name": f"{model_name} Count",
+            "icon": "fa-list",
+            "type": "basic",
+            "model": model_name,
+            "value_field": "id",
+            "aggregate_function": "count",
+            "text_color": "#ffffff",
+            "background_color": "#845ec2",
+        })
+        numeric = [o[0] for o in fields if len(o) == 4 and o[1] in ("integer", "float", "monetary") and "value" in o[3] and o[0] != "id"]
+        if numeric:
+            items.append({
+                "name": f"{model_name} {numeric[0]}",
+                "icon": "fa-calculator",
+                "type": "basic",
+                "model": model_name,
+                "value_field": numeric[0],
+                "aggregate_function": "sum",
+                "text_color": "#000000",
+                "background_color": "#ffc75f",
+            })
+    return f"```json\n{json.dumps(items, indent=4)}\n```"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = "\n".join(str(o.get("content") or "") for o in params.get("messages", []))
+        content = stub_answer(prompt)
+        created = int(time.time())
+
+        if not params.get("stream"):
+            self._send_json({
+                "id": "stub",
+                "object": "chat.completion",
+                "created": created,
+                "model": params.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_chunk(data):
+            payload = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            for line in content.splitlines(keepends=True):
+                send_chunk(json.dumps({
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": params.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": {"content": line}, "finish_reason": None}],
+                }))
+            send_chunk(json.dumps({
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": params.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }))
+            send_chunk("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client stops reading once the json code block is closed
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub llm server for the quickboard AI generator.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Quickboard llm stub listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 # -*- coding: utf-8 -*-
 import json
 import copy
+import logging
+import math
 
+from concurrent.futures import ThreadPoolExecutor
 from textwrap import dedent
-from prettytable import PrettyTable
 
 from autogen import Agent, AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager
 from autogen.coding import MarkdownCodeExtractor
 
-from .consts import DEFAULT_AUTOGEN_LLM_CONFIG, QUICKBOARD_COLORS, QUICKBOARD_DATA_ONLY_JSON_SCHEMA, QUICKBOARD_LAYOUT_JSON_SCHEMA
-from .json_validator_agent import UserProxyAgentForJsonValidation
+from .consts import QUICKBOARD_COLORS, QUICKBOARD_DATA_ONLY_JSON_SCHEMA
+from .json_validator_agent import JsonSchemaRepairer, UserProxyAgentForJsonValidation
+from .llm_backends import QuickboardLlmClient, get_llm_config
+from ..quickboard_layout import QuickboardLayout
+
+_logger = logging.getLogger(__name__)
+
+# conversations running at the same time when generating one model per conversation
+QUICKBOARD_AI_PARALLEL_WORKERS = 4
+# attempts for a model whose conversation did not end with valid json
+QUICKBOARD_AI_RETRIES = 2
+
+def estimate_tokens(text):
+    """Rough token count of a prompt (about 4 characters per token for english and code),
+    good enough to compare prompt sizes without depending on the llm tokenizer."""
+    return math.ceil(len(text) / 4)
 
 class QuickboardAiGenerator:
     _QUICKBOARD_GENERATOR_SYSTEM_MESSAGE = f"""
@@ -50,31 +66,18 @@ class QuickboardAiGenerator:
         Use these color palette for color parameters: {QUICKBOARD_COLORS}
 
         #EXAMPLE
-        Given a model with name 'sale.order' which have the following fields:
-        +-------------+------------------------+-----------+-------------------------+-------------------+
-        | Model       | Name                   | Type      | Description             | Usage             |
-        +-------------+------------------------+-----------+-------------------------+-------------------+
-        | ...         | ...                    | ...       | ...                     | ...               |
-        | sale.order  | id                     | integer   | ID                      | value, dimension  |
-        | sale.order  | date_order             | datetime  | Order Date              | dimension         |
-        | sale.order  | medium_id              | integer   | Medium                  | dimension         |
-        | sale.order  | sale_order_option_ids  | list      | Optional Products Lines |                   |
-        | sale.order  | amount_total           | monetary  | Total                   | value             |
-        | sale.order  | amount_to_invoice      | monetary  | Amount to invoice       | value             |
-        | ...         | ...                    | ...       | ...                     | ...               |
-        +-------------+------------------------+-----------+-------------------------+-------------------+
-
-        And a model with name 'sale.order.line' which have the following fields:
-        +------------------+---------------------------+-----------+--------------------------------+-------------------+
-        | Model            | Name                      | Type      | Description                    | Usage             |
-        +------------------+---------------------------+-----------+--------------------------------+-------------------+
-        | ...              | ...                       | ...       | ...                            | ...               |
-        | sale.order.line  | product_id                | integer   | Product                        | value, dimension  |
-        | sale.order.line  | product_uom_qty           | float     | Quantity                       | value             |
-        | sale.order.line  | qty_delivered_method      | char      | Method to update delivered qty | value, dimension  |
-        | sale.order.line  | qty_delivered             | float     | Delivery Quantity              | value             |
-        | ...              | ...                       | ...       | ...                            | ...               |
-        +------------------+---------------------------+-----------+--------------------------------+-------------------+
+        Given a model with name 'sale.order' which have the following fields (name|type|description|usage):
+        id|integer|ID|dimension,value
+        date_order|datetime|Order Date|dimension
+        medium_id|integer|Medium|dimension,value
+        amount_total|monetary|Total|value
+        amount_to_invoice|monetary|Amount to invoice|value
+
+        And a model with name 'sale.order.line' which have the following fields (name|type|description|usage):
+        product_id|integer|Product|dimension,value
+        product_uom_qty|float|Quantity|value
+        qty_delivered_method|char|Method to update delivered qty|dimension,value
+        qty_delivered|float|Delivery Quantity|value
 
         You may choose to answer as follow:
         ```json
@@ -148,6 +151,7 @@ class QuickboardAiGenerator:
 
     def __init__(self, env):
         self.env = env
+        self.llm_config = get_llm_config(self._get_llm_backends())
 
         self._admin: UserProxyAgent = None
         self._quickboard_ai: AssistantAgent = None
@@ -155,6 +159,8 @@ class QuickboardAiGenerator:
         self._groupchat: GroupChat = None
         self._manager: GroupChatManager = None
 
+        self.prompt_tokens = 0
+
     def _create_agents(self, data_json_schema):
         admin = UserProxyAgent(
             "admin",
@@ -169,8 +175,9 @@ class QuickboardAiGenerator:
             description=f"AI that generate dashboards.",
             system_message=dedent(self._QUICKBOARD_GENERATOR_SYSTEM_MESSAGE),
             human_input_mode="NEVER",
-            llm_config=DEFAULT_AUTOGEN_LLM_CONFIG,
+            llm_config=self.llm_config,
         )
+        quickboard_generator.register_model_client(model_client_cls=QuickboardLlmClient)
 
         data_json_validator = UserProxyAgentForJsonValidation(
             "data_json_validator",
@@ -207,8 +214,9 @@ class QuickboardAiGenerator:
         manager = GroupChatManager(
             groupchat=groupchat,
             name="chat_manager",
-            llm_config=DEFAULT_AUTOGEN_LLM_CONFIG
+            llm_config=self.llm_config
         )
+        manager.register_model_client(model_client_cls=QuickboardLlmClient)
 
         return (admin, quickboard_generator, data_json_validator, manager, groupchat)
 
@@ -219,47 +227,27 @@ class QuickboardAiGenerator:
         data_json_schema = copy.deepcopy(QUICKBOARD_DATA_ONLY_JSON_SCHEMA)
 
         for model in models:
-            field_defs = PrettyTable()
-            field_defs.align = "l"
-            field_defs.field_names = ["Model", "Name", "Type", "Description", "Usage"]
-
-            fields = self.env[model.model].fields_get()
-
-            valid_value_fields = []
-            valid_dimension_fields = []
-
-            for k, v in fields.items():
-                if v["store"]:
-
-                    if v["type"] in ["many2many", "one2many"]:
-                        field_type = "list"
-                    elif v["type"] == "selection":
-                        field_type = "char"
-                    elif v["type"] == "many2one":
-                        field_type = "integer"
-                    else:
-                        field_type = v["type"]
-
-                    usage = []
-                    if v["type"] not in ["many2many", "one2many", "float", "monetary"]:
-                        valid_dimension_fields.append(f"{k}")
-                        usage.append("dimension")
-
-                    if v["type"] in ["integer", "float", "monetary", "many2one", "selection"]:
-                        valid_value_fields.append(f"{k}")
-                        usage.append("value")
-
-                    field_defs.add_row([model.model, f"{k}", field_type, v['string'], ",".join(usage)])
-
-            valid_value_fields_str = ", ".join([f"'{o}'" for o in valid_value_fields])
-            valid_dimension_fields_str = ", ".join([f"'{o}'" for o in valid_dimension_fields])
+            field_infos = self.env["quickboard.item"]._get_model_field_infos(model.model)
+
+            valid_value_fields = list(field_infos["value_fields"])
+            count_only_value_fields = [
+                name
+                for name, ftype, _field_type, _string, _usage in field_infos["fields"]
+                if name in field_infos["value_fields"] and ftype not in ["float", "integer", "monetary"]
+            ]
+            valid_dimension_fields = list(field_infos["dimension_fields"])
+
+            # one line per usable field, no padding, the model name is given once in the message
+            field_defs = "\n".join(
+                f"{name}|{field_type}|{string}|{','.join(usage)}"
+                for name, _ftype, field_type, string, usage in field_infos["fields"]
+                if usage
+            )
 
             model_names.append(model.model)
             model_infos.append({
                 "name": model.model,
-                "field_defs": field_defs.get_string(),
-                "value_fields": valid_value_fields_str,
-                "dimension_fields": valid_dimension_fields_str
+                "field_defs": field_defs,
             })
 
             model_name_schema = {
@@ -295,9 +283,32 @@ class QuickboardAiGenerator:
                     }
                 }
 
-            data_json_schema["items"]["model"] = model_name_schema
+            # only count can be applied on non numeric fields, see quickboard.item constraints
+            aggregate_function_schema = {
+                "if": {
+                        "properties": {
+                            "model": model_name_schema,
+                            "value_field": {
+                                "enum": count_only_value_fields
+                            }
+                        }
+                    },
+                    "then": {
+                        "properties": {
+                            "aggregate_function": {
+                                "const": "count"
+                            }
+                        }
+                    }
+                }
+
             data_json_schema["items"]["allOf"].append(value_field_schema)
             data_json_schema["items"]["allOf"].append(dimension_field_schema)
+            data_json_schema["items"]["allOf"].append(aggregate_function_schema)
+
+        data_json_schema["items"]["properties"]["model"] = {
+            "enum": model_names
+        }
 
         return model_names, model_infos, data_json_schema
 
@@ -307,11 +318,9 @@ class QuickboardAiGenerator:
             """)
 
         for mi in model_infos:
-            mi_string = dedent(f"""
-                ### MODEL '{mi["name"]}'
-                The model '{mi["name"]}' has the following fields:
-                {mi["field_defs"]}
-            """)
+            mi_string = f"### MODEL '{mi['name']}'\n" \
+                f"The model '{mi['name']}' has the following fields (name|type|description|usage):\n" \
+                f"{mi['field_defs']}\n"
 
             message = message + "\n" + mi_string
 
@@ -329,300 +338,143 @@ class QuickboardAiGenerator:
 
         return message
 
-    def _arrange_items(self, quickboard_items):
-        items = copy.deepcopy(quickboard_items)
-        basic_items = [o for o in items if o["type"] == "basic"]
-        list_chart_items = [o for o in items if o["type"] != "basic"]
-
-        fin = []
-        row = 0
-        while len(basic_items) > 0:
-            count = 1
-            width = 6
-            if len(basic_items) >= 6:
-                count = 6
-                width = 2
-            elif len(basic_items) >= 4:
-                count = 4
-                width = 3
-            elif len(basic_items) >= 3:
-                count = 3
-                width = 4
-            elif len(basic_items) >= 2:
-                count = 2
-                width = 6
-
-            row_items = basic_items[:count]
-            for k, o in enumerate(row_items):
-                o["y_pos"] = row
-                o["x_pos"] = k * width
-                o["height"] = 1
-                o["width"] = width
-
-            fin.extend(row_items)
-            del basic_items[:count]
-
-            row += 1
-
-        while len(list_chart_items) > 0:
-            width = 4
-            count = 3
-
-            if len(list_chart_items) >= 4:
-                count = 4
-                width = 3
-            elif len(list_chart_items) >= 3:
-                count = 3
-                width = 4
-            elif len(list_chart_items) >= 2:
-                count = 2
-                width = 6
-
-            row_items = list_chart_items[:count]
-            for k, o in enumerate(row_items):
-                o["y_pos"] = row
-                o["x_pos"] = k * width
-                o["height"] = 2
-                o["width"] = width
-
-            fin.extend(row_items)
-            del list_chart_items[:count]
-
-            row += 2
-
-        return fin
-
-    def generate_quickboard(self, models, layout_by_ai, screen_w, screen_h, cell_w, cell_h):
-        model_names, model_infos, json_schema = self._build_agent_parameters(models)
-
-        self._admin,\
-        self._quickboard_ai,\
-        self._json_validator,\
-        self._manager,\
-        self._groupchat = self._create_agents(json_schema)
-
-        message = self._create_message(model_names, model_infos)
-        answer = self._admin.initiate_chat(self._manager, message=message) #, silent=True)
-
-        res = ""
-
-        # The json is not on answer.summary / last message since the last agent is json validator when successful
-        if answer.summary.find("exitcode: 0") > -1:
-            extractor = MarkdownCodeExtractor()
-            code_blocks = extractor.extract_code_blocks(answer.chat_history[-2]["content"])
-            if len(code_blocks) > 0:
-                quickboard = code_blocks[0].code
-                quickboard_items = json.loads(quickboard)
-
-                arranged_items = []
-                if layout_by_ai:
-                    aiDesigner = QuickboardAIDesigner()
-                    arranged_items = aiDesigner.arrange_items_with_ai(quickboard_items, screen_w, screen_h, cell_w, cell_h)
-                else:
-                    arranged_items = self._arrange_items(quickboard_items)
-
-                res = json.dumps(arranged_items)
-
-        return res
-
-class QuickboardAIDesigner:
-    _QUICKBOARD_DESIGNER_SYSTEM_MESSAGE = f"""
-        Your task is to design the layout of a dashboard from the given dashboard items.
-
-        ## DASHBOARD ITEM TYPES
-        There are three kind of dashboard items, basic, list and chart.
-        A basic item is used for single value KPI, a list is used to display data in a tabular list
-        while a chart item is used to show data in a graphical chart.
-
-        All have the following attribute:
-        1. id: The id of the dashboard item.
-        2. type: Dashboard item type, 'basic' for basic items, 'list' for list items and 'chart' for chart items.
-        3. x_pos: The horizontal position on the grid (0 to 11, representing the block's position).
-        4. y_pos: The vertical position on the grid (measured in blocks, can be unlimited).
-        5. width: The width of the item.
-        6. height: The height of the item.
-
-        ## LAYOUT
-        The dashboard layout is a grid system measured in square blocks.
-
-        It has 12 blocks for column width and unlimited cell rows.
-        The origin (0, 0) position is on the top left. The maximum position of the top row is (12, 0).
-
-        ## REQUIREMENTS
-        1. Prioritize the arrangement of blocks to optimize space, i,e. no gaps between items.
-        2. Ensure that no blocks overlap and that all blocks are positioned within the defined grid limits.
-        3. Arrange the 'basic' items to fill the top rows.
-        4. Arrange the rest of the items to fill the rows after the 'basic' items.
-
-        ## RULES
-        1. Do not change the 'id' and the 'type' of the dashboard items,
-           i.e, the 'id' and 'type' is a fixed pair. If you want to re-arrange the items, always use the same 'id' and 'type' pair.
-        2. Only edit these attribute 'x_pos', 'y_pos', 'width', 'height'.
-        3. Do not add nor remove dashboard items!
-        4. Fence your anwser with markdown json block.
-        5. Do not comment. Do not explain your answer.
-        6. Your answer will be validated by a bot, if your answer is not valid then you must fix it.
-        7. When fixing answer re-evaluate everything and do not give comment as it will create another error.
-        8. When fixing answer always reply with the the fixed json code block with every items.
-    """
-
-    def __init__(self):
-        self._admin: UserProxyAgent = None
-        self._quickboard_ai: AssistantAgent = None
-        self._json_validator: UserProxyAgentForJsonValidation = None
-        self._groupchat: GroupChat = None
-        self._manager: GroupChatManager = None
-
-    def _create_agents(self, ui_json_schema):
-        admin = UserProxyAgent(
-            "admin",
-            description="The user who give tasks and questions.",
-            human_input_mode="NEVER",
-            is_termination_msg=lambda message: True,  # Always True
-            code_execution_config=False,
+    def _get_llm_backends(self):
+        backends = self.env["ir.config_parameter"].sudo().get_param("quickboard.llm_backends")
+        if not backends:
+            return None
+        try:
+            return json.loads(backends)
+        except ValueError:
+            _logger.warning("Invalid quickboard.llm_backends parameter, using the default backends.")
+            return None
+
+    def _get_cache_key(self, message):
+        llm_config = self.llm_config
+        return self.env["quickboard.ai.cache"]._make_key(
+            dedent(self._QUICKBOARD_GENERATOR_SYSTEM_MESSAGE),
+            message,
+            sorted({o["model"] for config in llm_config["config_list"] for o in config["backends"]}),
+            llm_config.get("temperature"),
         )
 
-        quickboard_designer = AssistantAgent(
-            name="quickboard_designer",
-            description=f"AI that design the layout of dashboards.",
-            system_message=dedent(self._QUICKBOARD_DESIGNER_SYSTEM_MESSAGE),
-            human_input_mode="NEVER",
-            llm_config=DEFAULT_AUTOGEN_LLM_CONFIG,
-        )
-
-        ui_json_validator = UserProxyAgentForJsonValidation(
-            "ui_json_validator",
-            json_schema=ui_json_schema,
-            description="An bot that performs no other action than validating json (provided to it's quoted in json blocks).",
-            human_input_mode="NEVER",
-        )
+    def _extract_answer(self, answer, json_schema):
+        """Returns the validated json of a conversation, with the repairs done by the validator, or None."""
+        # The json is not on answer.summary / last message since the last agent is json validator when successful
+        if answer.summary.find("exitcode: 0") == -1:
+            return None
+
+        extractor = MarkdownCodeExtractor()
+        code_blocks = extractor.extract_code_blocks(answer.chat_history[-2]["content"])
+        if len(code_blocks) == 0:
+            return None
+
+        # the validator only repairs its own copy, apply the same repairs on the answer
+        quickboard_items = json.loads(code_blocks[0].code)
+        JsonSchemaRepairer(json_schema).validate(quickboard_items)
+        return json.dumps(quickboard_items)
+
+    def _chat(self, json_schema, message):
+        """Run the generation conversation, returns the validated json code or None.
+
+        Does not use the environment so it can run in a worker thread."""
+        admin, quickboard_ai, json_validator, manager, groupchat = self._create_agents(json_schema)
+        answer = admin.initiate_chat(manager, message=message) #, silent=True)
+        return self._extract_answer(answer, json_schema)
+
+    def _chat_with_retries(self, json_schema, message):
+        for attempt in range(1, QUICKBOARD_AI_RETRIES + 1):
+            try:
+                quickboard = self._chat(json_schema, message)
+            except Exception as e:
+                _logger.warning("Quickboard AI generation attempt %s failed: %s", attempt, e)
+                quickboard = None
+            if quickboard:
+                return quickboard
+        return None
+
+    def _generate_items(self, models):
+        """Generate the items of all models in one conversation."""
+        model_names, model_infos, json_schema = self._build_agent_parameters(models)
+        message = self._create_message(model_names, model_infos)
 
-        def _speaker_selection_func(last_speaker: Agent, groupchat: GroupChat):
-            last_messages = groupchat.messages[-1]
-            next_speaker = admin
+        self.prompt_tokens = estimate_tokens(dedent(self._QUICKBOARD_GENERATOR_SYSTEM_MESSAGE)) + estimate_tokens(message)
+        _logger.info("Quickboard AI prompt for %s: about %s tokens", model_names, self.prompt_tokens)
 
-            if last_speaker is admin:
-                next_speaker = quickboard_designer
-            elif last_speaker is quickboard_designer:
-                next_speaker = ui_json_validator
-            elif last_speaker is ui_json_validator:
-                # if last agent reply with invalid json then let it try again
-                if last_messages["content"].find("exitcode: -1") > -1:
-                    next_speaker = quickboard_designer
-                elif last_messages["content"].strip() == "":
-                    next_speaker = quickboard_designer
+        # the same prompt to the same llm is answered from the cache, without calling the llm
+        ai_cache = self.env["quickboard.ai.cache"]
+        cache_key = self._get_cache_key(message)
+        quickboard = ai_cache._get(cache_key)
 
-            return next_speaker
+        if not quickboard:
+            self._admin,\
+            self._quickboard_ai,\
+            self._json_validator,\
+            self._manager,\
+            self._groupchat = self._create_agents(json_schema)
 
-        groupchat = GroupChat(
-            agents=[admin, quickboard_designer, ui_json_validator],
-            messages=[],
-            max_round=5,
-            speaker_selection_method= _speaker_selection_func,
-            # send_introductions=True,
-        )
+            answer = self._admin.initiate_chat(self._manager, message=message) #, silent=True)
+            quickboard = self._extract_answer(answer, json_schema)
+            if quickboard:
+                ai_cache._put(cache_key, quickboard)
 
-        manager = GroupChatManager(
-            groupchat=groupchat,
-            name="chat_manager",
-            llm_config=DEFAULT_AUTOGEN_LLM_CONFIG
-        )
+        return json.loads(quickboard) if quickboard else None
 
-        return (admin, quickboard_designer, ui_json_validator, manager, groupchat)
+    def _generate_items_per_model(self, models):
+        """Generate the items of each model in its own conversation, in parallel.
 
-    def _build_agent_parameters(self, quickboard_items):
-        layout_json_schema = copy.deepcopy(QUICKBOARD_LAYOUT_JSON_SCHEMA)
+        Prompts and cache are handled here, only the conversations run in the workers. A model
+        failing is retried alone, a model failing all its retries is left out of the board."""
+        ai_cache = self.env["quickboard.ai.cache"]
+        self.prompt_tokens = 0
 
-        item_count = len(quickboard_items)
-        item_count_schema  = {
-                "minItems": item_count,
-                "maxItems": item_count
-            }
-
-        layout_json_schema.update(item_count_schema)
-
-        item_id_type_schema = []
-        for item in quickboard_items:
-            id_type_schema = {
-                "if": {
-                        "properties": {
-                            "id": { "const": item["id"] }
-                        }
-                    },
-                    "then": {
-                        "properties": {
-                            "type": { "const": item["type"] }
-                        }
-                    }
+        answers = {}
+        to_generate = {}
+        for model in models:
+            model_names, model_infos, json_schema = self._build_agent_parameters(model)
+            message = self._create_message(model_names, model_infos)
+            self.prompt_tokens += estimate_tokens(dedent(self._QUICKBOARD_GENERATOR_SYSTEM_MESSAGE)) + estimate_tokens(message)
+
+            cache_key = self._get_cache_key(message)
+            quickboard = ai_cache._get(cache_key)
+            if quickboard:
+                answers[model.model] = quickboard
+            else:
+                to_generate[model.model] = (cache_key, json_schema, message)
+
+        _logger.info("Quickboard AI prompts for %s: about %s tokens", models.mapped("model"), self.prompt_tokens)
+
+        if to_generate:
+            with ThreadPoolExecutor(max_workers=QUICKBOARD_AI_PARALLEL_WORKERS, thread_name_prefix="quickboard_ai_model") as executor:
+                futures = {
+                    model_name: executor.submit(self._chat_with_retries, json_schema, message)
+                    for model_name, (_cache_key, json_schema, message) in to_generate.items()
                 }
-            item_id_type_schema.append(id_type_schema)
-
-        layout_json_schema["items"]["allOf"] = item_id_type_schema
-
-        return layout_json_schema
-
-    def _create_message(self, quickboard_items, screen_w, screen_h, cell_w, cell_h):
-        layout_items = [[{
-                "id": o["id"],
-                "type": o["type"],
-                "x_pos": 0,
-                "y_pos": 0,
-                "width": 0,
-                "height": 0
-            }] for o in quickboard_items]
-
-        layout_items_count = len(layout_items)
-        layout_items_str = ", ".join([ f"{json.dumps(o)}\n" for o in layout_items])
-
-        message = f"""
-            Design dashboard layout for these {layout_items_count} items: {layout_items_str}.
-
-            The cell size for my screen is {cell_w} x {cell_h} (width x height).
-            My screen size is {screen_w} x {screen_h} (width x height).
-
-            Make it compact, for 'basic' items 1 block for its height is enough.
-            For 'list' and 'chart' items 3 blocks for its height are enough.
-
-            Put basic items first then list and chart items.
-            Do not change the 'id' and the 'type' of the items.
-            Remember there are {layout_items_count}, use them all, do not add any item nor remove any of them.
-        """
-        return message
-
-    def arrange_items_with_ai(self, quickboard_items, screen_w, screen_h, cell_w, cell_h):
-        res = quickboard_items
-        for i, item in enumerate(quickboard_items, start=1):
-            item["id"] = i
-
-        json_schema = self._build_agent_parameters(quickboard_items)
-
-        self._admin,\
-        self._quickboard_ai,\
-        self._json_validator,\
-        self._manager,\
-        self._groupchat = self._create_agents(json_schema)
-
-        message = self._create_message(quickboard_items, screen_w, screen_h, cell_w, cell_h)
-        answer = self._admin.initiate_chat(self._manager, message=message) #, silent=True)
+                for model_name, future in futures.items():
+                    quickboard = future.result()
+                    if not quickboard:
+                        _logger.warning("Quickboard AI generation failed for model %s", model_name)
+                        continue
+                    answers[model_name] = quickboard
+                    ai_cache._put(to_generate[model_name][0], quickboard)
+
+        # merge in the order of the models
+        items = []
+        for model in models:
+            if model.model in answers:
+                items.extend(json.loads(answers[model.model]))
 
-        if answer.summary.find("exitcode: 0") > -1:
-            extractor = MarkdownCodeExtractor()
-            code_blocks = extractor.extract_code_blocks(answer.chat_history[-2]["content"])
-            if len(code_blocks) > 0:
-                layout = code_blocks[0].code
-                layout_items = json.loads(layout)
+        return items or None
 
-            # merge item and layout
-            fin_items = []
-            for item in quickboard_items:
-                for layout in layout_items:
-                    if layout["id"] == item["id"] and layout["type"] == item["type"]:
-                        item.update(layout)
-                        break
+    def generate_quickboard(self, models, screen_w, screen_h, cell_w, cell_h, per_model=False):
+        if per_model:
+            quickboard_items = self._generate_items_per_model(models)
+        else:
+            quickboard_items = self._generate_items(models)
 
-                fin_items.append(item)
+        res = ""
 
-            return fin_items
+        if quickboard_items:
+            arranged_items = QuickboardLayout(screen_w, screen_h, cell_w, cell_h).arrange(quickboard_items)
+            res = json.dumps(arranged_items)
 
         return res
-
@@ -2,77 +2,28 @@
 import logging
 from collections import deque
 
-from odoo import _, fields, models
+from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError
 
+from .quickboard_layout import QuickboardLayout
+
 _logger = logging.getLogger(__name__)
 
 class QuickboardGenerator(models.TransientModel):
     _name = "quickboard.generator"
 
     model_ids = fields.Many2many('ir.model', string='Model')
-    layout_by_ai = fields.Boolean("Layout by AI", default=False)
+    use_ai = fields.Boolean("Generate with AI", default=False)
+    ai_per_model = fields.Boolean("One Conversation per Model", default=True)
 
     def _collect_fields(self, model_record):
         """Return (value_fields, dimension_fields, field_map) for a given ir.model record."""
-        fields_info = self.env[model_record.model].fields_get()
-        value_fields = []
-        dimension_fields = []
-        field_map = {}
-        for name, info in fields_info.items():
-            if not info.get("store", True):
-                continue
-            ftype = info.get("type")
-            # normalize types similar to original logic
-            if ftype in ["many2many", "one2many"]:
-                continue
-            if ftype == "selection":
-                ftype_norm = "char"
-            elif ftype == "many2one":
-                ftype_norm = "integer"
-            else:
-                ftype_norm = ftype
-            if ftype_norm in ["integer", "float", "monetary", "many2one", "selection"]:
-                value_fields.append(name)
-            if ftype_norm not in ["many2many", "one2many", "float", "monetary"]:
-                dimension_fields.append(name)
-            field_map[name] = ftype_norm
+        field_infos = self.env["quickboard.item"]._get_model_field_infos(model_record.model)
+        value_fields = list(field_infos["value_fields"])
+        dimension_fields = list(field_infos["dimension_fields"])
+        field_map = {name: ftype_norm for name, _ftype, ftype_norm, _string, _usage in field_infos["fields"] if ftype_norm != "list"}
         return value_fields, dimension_fields, field_map
 
-    def _arrange_items_simple(self, items):
-        """Simple layout: place basic items in rows of 4 (width=3), others width=6 height=2."""
-        x_cursor = 0
-        y_cursor = 0
-        row_height = 1
-        basics = [i for i in items if i["type"] == "basic"]
-        others = [i for i in items if i["type"] != "basic"]
-        arranged = []
-
-        # basics: 4 per row, width=3, height=1
-        cols = 4
-        width_basic = 3
-        for idx, b in enumerate(basics):
-            row = idx // cols
-            col = idx % cols
-            b["x_pos"] = col * width_basic
-            b["y_pos"] = row * 1
-            b["width"] = width_basic
-            b["height"] = 1
-            arranged.append(b)
-
-        # others: place after basics, 2 per row, width=6 height=2
-        start_row = ((len(basics) + cols - 1) // cols)  # next free row
-        for idx, o in enumerate(others):
-            row = start_row + (idx // 2) * 2
-            col = idx % 2
-            o["x_pos"] = col * 6
-            o["y_pos"] = row
-            o["width"] = 6
-            o["height"] = 2
-            arranged.append(o)
-
-        return arranged
-
     def _generate_items_for_model(self, model_record):
         """Deterministic generator for items from a model."""
         value_fields, dimension_fields, field_map = self._collect_fields(model_record)
@@ -148,6 +99,91 @@ class QuickboardGenerator(models.TransientModel):
 
         return items
 
+    @api.model
+    def _create_quickboard_items(self, arranged, keep_layout=False):
+        """Replace the items of the current user by the given generated items, their
+        positions are only kept with keep_layout, otherwise they are placed by create."""
+        # resolve every model and field of the generated items at once
+        model_names = {o["model"] for o in arranged}
+        field_names = {o["value_field"] for o in arranged} | {o["dimension_field"] for o in arranged if o.get("dimension_field")}
+        model_ids = {
+            o.model: o.id for o in self.env["ir.model"].search([("model", "in", list(model_names))])
+        }
+        field_ids = {
+            (o.model, o.name): o.id for o in self.env["ir.model.fields"].search([
+                ("model", "in", list(model_names)),
+                ("name", "in", list(field_names))
+            ])
+        }
+
+        quickboard_item = self.env['quickboard.item']
+        # remove existing items
+        quickboard_item.search([("create_uid", "=", self.env.uid)]).unlink()
+
+        vals_list = []
+        for o in arranged:
+            _logger.info(f"Creating quickboard item: {o}")
+            model_id = model_ids.get(o["model"])
+            if not model_id:
+                continue
+            value_field_id = field_ids.get((o["model"], o["value_field"]))
+            if not value_field_id:
+                # skip invalid field
+                continue
+
+            vals = {
+                "name": o.get("name"),
+                "model_id": model_id,
+                "icon": o.get("icon", "fa-square"),
+                "type": o.get("type"),
+                "value_field_id": value_field_id,
+                "aggregate_function": o.get("aggregate_function", "count"),
+                "x_pos": o.get("x_pos", 0),
+                "y_pos": o.get("y_pos", 0),
+                "height": o.get("height", 1),
+                "width": o.get("width", 6),
+            }
+
+            if o.get("type") == "basic":
+                vals.update({
+                    "text_color": o.get("text_color", "#000000"),
+                    "background_color": o.get("background_color", "#aaaaaa"),
+                })
+            elif o.get("type") == "chart":
+                dimension_field_id = field_ids.get((o["model"], o.get("dimension_field")))
+                if not dimension_field_id:
+                    continue
+                vals.update({
+                    "dimension_field_id": dimension_field_id,
+                    "chart_type": o.get("chart_type", "bar"),
+                })
+                if "datetime_granularity" in o:
+                    vals.update({"datetime_granularity": o.get("datetime_granularity")})
+            elif o.get("type") == "list":
+                dimension_field_id = field_ids.get((o["model"], o.get("dimension_field")))
+                if not dimension_field_id:
+                    continue
+                vals.update({
+                    "dimension_field_id": dimension_field_id,
+                    "list_row_limit": o.get("list_row_limit", 10),
+                })
+                if "datetime_granularity" in o:
+                    vals.update({"datetime_granularity": o.get("datetime_granularity")})
+
+            vals_list.append(vals)
+
+        return quickboard_item.with_context(ai_generation=keep_layout).create(vals_list)
+
+    @api.model
+    def _send_quickboard_updated(self):
+        # send the new definitions so the dashboards don't have to fetch them again
+        items = self.env['quickboard.item'].with_context({"hide_model": True}).search([], order="id")
+        self.env["bus.bus"]._sendone(
+            self.env.user.partner_id,
+            "quickboard_updated",
+            {"items": items._read_quickboard_values()}
+        )
+
     def action_generate_quickboard(self):
         if len(self.model_ids.ids) < 1:
             return {
@@ -160,77 +196,45 @@ class QuickboardGenerator(models.TransientModel):
                 'target': 'new',
             }
 
+        if self.use_ai:
+            # the llm can take minutes, don't hold the http worker, the result comes through the bus
+            job = self.env["quickboard.ai.job"].create({
+                "model_ids": [(6, 0, self.model_ids.ids)],
+                "ai_per_model": self.ai_per_model,
+                "screen_width": self.env.context.get("screen_width", 0),
+                "screen_height": self.env.context.get("screen_height", 0),
+                "cell_width": self.env.context.get("cell_width", 1),
+                "cell_height": self.env.context.get("cell_height", 1),
+            })
+            job._enqueue()
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'type': 'info',
+                    'message': _("Quickboard generation queued (job %s), the board will be updated when it is done.", job.id),
+                    'next': {'type': 'ir.actions.act_window_close'},
+                },
+            }
+
         try:
             all_items = []
-            for model in self.model_ids:
-                model_rec = self.env['ir.model'].search([('id','=',model.id)], limit=1)
-                if not model_rec:
-                    continue
+            for model_rec in self.model_ids:
                 generated = self._generate_items_for_model(model_rec)
                 all_items.extend(generated)
 
-            arranged = self._arrange_items_simple(all_items)
-
-            quickboard_item = self.env['quickboard.item']
-            # remove existing items
-            quickboard_item.search([]).unlink()
-
-            for o in arranged:
-                _logger.info(f"Creating quickboard item: {o}")
-                model = self.env["ir.model"].search([("model", "=", o["model"])], limit=1)
-                if not model:
-                    continue
-                value_field = self.env["ir.model.fields"].search([("model_id", "=", model.id), ("name", "=", o["value_field"])], limit=1)
-                if not value_field:
-                    # skip invalid field
-                    continue
-
-                vals = {
-                    "name": o.get("name"),
-                    "model_id": model.id,
-                    "icon": o.get("icon", "fa-square"),
-                    "type": o.get("type"),
-                    "value_field_id": value_field.id,
-                    "aggregate_function": o.get("aggregate_function", "count"),
-                    "x_pos": o.get("x_pos", 0),
-                    "y_pos": o.get("y_pos", 0),
-                    "height": o.get("height", 1),
-                    "width": o.get("width", 6),
-                }
-
-                if o.get("type") == "basic":
-                    vals.update({
-                        "text_color": o.get("text_color", "#000000"),
-                        "background_color": o.get("background_color", "#aaaaaa"),
-                    })
-                elif o.get("type") == "chart":
-                    dimension_field = self.env["ir.model.fields"].search([("model_id", "=", model.id), ("name", "=", o.get("dimension_field"))], limit=1)
-                    if not dimension_field:
-                        continue
-                    vals.update({
-                        "dimension_field_id": dimension_field.id,
-                        "chart_type": o.get("chart_type", "bar"),
-                    })
-                    if "datetime_granularity" in o:
-                        vals.update({"datetime_granularity": o.get("datetime_granularity")})
-                elif o.get("type") == "list":
-                    dimension_field = self.env["ir.model.fields"].search([("model_id", "=", model.id), ("name", "=", o.get("dimension_field"))], limit=1)
-                    if not dimension_field:
-                        continue
-                    vals.update({
-                        "dimension_field_id": dimension_field.id,
-                        "list_row_limit": o.get("list_row_limit", 10),
-                    })
-                    if "datetime_granularity" in o:
-                        vals.update({"datetime_granularity": o.get("datetime_granularity")})
-
-                quickboard_item.with_context(ai_generation=False).create(vals)
+            arranged = QuickboardLayout(
+                self.env.context.get("screen_width", 0),
+                self.env.context.get("screen_height", 0),
+                self.env.context.get("cell_width", 1),
+                self.env.context.get("cell_height", 1),
+            ).arrange(all_items)
+            self._create_quickboard_items(arranged, keep_layout=True)
 
         except Exception as e:
             _logger.exception("Error generating quickboard: %s", e)
             raise ValidationError(_("Unable to generate quickboard. Please check logs."))
 
-        for rec in self:
-            self.env["bus.bus"]._sendone("quickboard", "quickboard_updated", {})
+        self._send_quickboard_updated()
 
         return True
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import math
+
+from ..models.quickboard_item import QUICKBOARD_GRID_COLUMNS
+
+# minimum readable size of the tiles in pixels, used to choose their number of columns
+QUICKBOARD_BASIC_MIN_WIDTH = 180
+QUICKBOARD_CHART_MIN_WIDTH = 360
+# height of charts and lists relative to their width
+QUICKBOARD_CHART_RATIO = 0.6
+QUICKBOARD_CHART_MIN_HEIGHT = 2
+QUICKBOARD_CHART_MAX_HEIGHT = 4
+
+class QuickboardLayout:
+    """Deterministic layout of generated items on the grid of the dashboard.
+
+    Tile sizes are derived from the screen and the grid cell size, the tiles are then
+    packed first fit on the cells of the grid: each tile goes at the highest place it
+    fits, leftmost first, holes left by the previous tiles included. Basic items are
+    placed first so the KPIs stay on top, then the tiles are grown into the free cells
+    next to them, the KPIs only horizontally so they keep their single row.
+
+    The grid only gets fuller, so the scan for a tile size resumes at the row where the
+    previous tile of that size was placed, and stops at the skyline of the columns where
+    a place is certain: packing is linear in the number of tiles.
+
+    It is a heuristic, not the smallest packing: keeping the KPIs on top and the tiles
+    of a kind at the same size can cost a few rows, or leave a few cells empty under the
+    last row of KPIs, on some item counts.
+    """
+    def __init__(self, screen_w=0, screen_h=0, cell_w=0, cell_h=0, columns=QUICKBOARD_GRID_COLUMNS):
+        self.columns = columns
+        self.screen_w = screen_w or 0
+        self.screen_h = screen_h or 0
+        # the grid is not always available on the client, sizes of 1 are the fallback sent then
+        self.cell_w = cell_w if cell_w and cell_w > 1 else 0
+        self.cell_h = cell_h if cell_h and cell_h > 1 else 0
+
+    def _min_columns(self, min_width, default):
+        if not self.cell_w:
+            return default
+        return min(max(math.ceil(min_width / self.cell_w), 1), self.columns)
+
+    def _tile_width(self, count, min_columns):
+        """Widest width dividing the grid so that a row of tiles fills it."""
+        per_row = max(min(count, self.columns // min_columns), 1)
+        return self.columns // per_row
+
+    def _chart_height(self, width):
+        if not self.cell_w or not self.cell_h:
+            return QUICKBOARD_CHART_MIN_HEIGHT
+
+        height = math.ceil(width * self.cell_w * QUICKBOARD_CHART_RATIO / self.cell_h)
+        max_height = QUICKBOARD_CHART_MAX_HEIGHT
+        if self.screen_h:
+            # keep a row of charts and a row of basic items within the screen
+            max_height = min(max_height, int(self.screen_h // self.cell_h) - 1)
+        return int(min(max(height, QUICKBOARD_CHART_MIN_HEIGHT), max(max_height, QUICKBOARD_CHART_MIN_HEIGHT)))
+
+    def _sizes(self, items):
+        basic_count = len([o for o in items if o["type"] == "basic"])
+        chart_count = len(items) - basic_count
+
+        basic_width = self._tile_width(basic_count, self._min_columns(QUICKBOARD_BASIC_MIN_WIDTH, 3))
+        chart_width = self._tile_width(chart_count, self._min_columns(QUICKBOARD_CHART_MIN_WIDTH, 6))
+
+        return {
+            "basic": (basic_width, 1),
+            "chart": (chart_width, self._chart_height(chart_width)),
+        }
+
+    def arrange(self, items):
+        """Set x_pos, y_pos, width and height on the items, returns them basic items first."""
+        sizes = self._sizes(items)
+        ordered = [o for o in items if o["type"] == "basic"] + [o for o in items if o["type"] != "basic"]
+
+        # occupied cells of the grid, by row
+        grid = []
+
+        def is_free(x, y, width, height):
+            return not any(any(row[x:x + width]) for row in grid[y:y + height])
+
+        def occupy(x, y, width, height):
+            while len(grid) < y + height:
+                grid.append([False] * self.columns)
+            for row in grid[y:y + height]:
+                row[x:x + width] = [True] * width
+
+        # height of each column, any place at or above it is free
+        skyline = [0] * self.columns
+        # row where the last tile of each size was placed, no place above it is left
+        start_rows = {}
+
+        for item in ordered:
+            width, height = sizes["basic" if item["type"] == "basic" else "chart"]
+
+            # the holes below the skyline are tried first, the skyline is the fallback
+            top_x = min(range(self.columns - width + 1), key=lambda x: max(skyline[x:x + width]))
+            x, y = top_x, max(skyline[top_x:top_x + width])
+            for row in range(start_rows.get((width, height), 0), y):
+                hole_x = next((o for o in range(self.columns - width + 1) if is_free(o, row, width, height)), None)
+                if hole_x is not None:
+                    x, y = hole_x, row
+                    break
+            start_rows[(width, height)] = y
+
+            item.update({"x_pos": x, "y_pos": y, "width": width, "height": height})
+            occupy(x, y, width, height)
+            skyline[x:x + width] = [max(max(skyline[x:x + width]), y + height)] * width
+
+        # grow the tiles into the free cells next to them, the board keeps its height
+        board_height = len(grid)
+        for item in ordered:
+            x, y, width, height = item["x_pos"], item["y_pos"], item["width"], item["height"]
+            while x + width < self.columns and is_free(x + width, y, 1, height):
+                occupy(x + width, y, 1, height)
+                width += 1
+            while x > 0 and is_free(x - 1, y, 1, height):
+                x -= 1
+                occupy(x, y, 1, height)
+                width += 1
+            while item["type"] != "basic" and y + height < board_height and is_free(x, y + height, width, 1):
+                occupy(x, y + height, width, 1)
+                height += 1
+
+            item.update({"x_pos": x, "y_pos": y, "width": width, "height": height})
+
+        return ordered